@@ -0,0 +1,41 @@
+import sys
+import time
+
+from inline_markdown import split_nodes_image, split_nodes_link
+from textnode import TextNode, TextType
+
+LINK_COUNTS = (100, 200, 400, 800, 1600, 3200)
+
+
+def make_paragraph(link_count):
+    parts = []
+    for i in range(link_count):
+        parts.append(f"Entry {i} points to [post number {i}](/blog/post-{i}) and ")
+        if i % 10 == 0:
+            parts.append(f"![figure {i}](/images/figure-{i}.png) ")
+    return "".join(parts)
+
+
+def time_split(text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        split_nodes_image(split_nodes_link([TextNode(text, TextType.TEXT)]))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'links':>8} {'chars':>10} {'best ms':>10} {'us/link':>10}")
+    for link_count in LINK_COUNTS:
+        text = make_paragraph(link_count)
+        elapsed = time_split(text, repeat)
+        print(
+            f"{link_count:>8} {len(text):>10} {elapsed * 1000:>10.3f}"
+            f" {elapsed * 1_000_000 / link_count:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
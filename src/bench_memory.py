@@ -0,0 +1,118 @@
+import contextlib
+import glob
+import os
+import sys
+import tracemalloc
+from unittest import mock
+
+import block_markdown
+import inline_markdown
+import textnode
+from block_markdown import markdown_to_html_node
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+
+NODE_COUNT = 100_000
+
+
+def measure_peak(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+# Subclasses without __slots__ get a per-instance __dict__ again, which is
+# what the node classes looked like before they were slotted.
+class DictTextNode(TextNode):
+    pass
+
+
+class DictLeafNode(LeafNode):
+    pass
+
+
+class DictParentNode(ParentNode):
+    pass
+
+
+@contextlib.contextmanager
+def dict_nodes():
+    with (
+        mock.patch.object(block_markdown, "TextNode", DictTextNode),
+        mock.patch.object(block_markdown, "LeafNode", DictLeafNode),
+        mock.patch.object(block_markdown, "ParentNode", DictParentNode),
+        mock.patch.object(inline_markdown, "TextNode", DictTextNode),
+        mock.patch.object(textnode, "LeafNode", DictLeafNode),
+    ):
+        yield
+
+
+def measure_both(func, *args):
+    with dict_nodes():
+        before = measure_peak(func, *args)
+    return before, measure_peak(func, *args)
+
+
+def build_and_render(markdown):
+    return markdown_to_html_node(markdown).to_html()
+
+
+def bytes_per_node(factory):
+    tracemalloc.start()
+    try:
+        nodes = [factory() for _ in range(NODE_COUNT)]
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Subtract the list holding the nodes so only the nodes themselves count.
+    return (current - sys.getsizeof(nodes)) / len(nodes)
+
+
+def make_large_page(paragraphs=2000):
+    block = (
+        "This is **bold** text with an _italic_ word, some `code`, a "
+        "[link](/blog/post) and an ![image](/images/figure.png) in it."
+    )
+    return "# Large page\n\n" + "\n\n".join(block for _ in range(paragraphs))
+
+
+def print_row(name, markdown, before, after):
+    before_kib = before / 1024
+    after_kib = after / 1024
+    print(f"{name:<40} {len(markdown):>10} {before_kib:>13.1f} {after_kib:>10.1f}")
+
+
+def main():
+    content_dir = os.path.join(os.path.dirname(__file__), "..", "content")
+    pages = sorted(glob.glob(os.path.join(content_dir, "**", "*.md"), recursive=True))
+
+    print(f"{'page':<40} {'chars':>10} {'__dict__ KiB':>13} {'slots KiB':>10}")
+    for path in pages:
+        with open(path) as f:
+            markdown = f.read()
+        before, after = measure_both(build_and_render, markdown)
+        print_row(os.path.relpath(path, content_dir), markdown, before, after)
+
+    markdown = make_large_page()
+    before, after = measure_both(build_and_render, markdown)
+    print_row("<synthetic large page>", markdown, before, after)
+
+    for name, dict_factory, factory in (
+        (
+            "TextNode",
+            lambda: DictTextNode("x", TextType.TEXT),
+            lambda: TextNode("x", TextType.TEXT),
+        ),
+        ("LeafNode", lambda: DictLeafNode("b", "x"), lambda: LeafNode("b", "x")),
+    ):
+        before = bytes_per_node(dict_factory)
+        after = bytes_per_node(factory)
+        print(f"{name}: {before:.1f} -> {after:.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from block_markdown import (
+    BlockType,
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    render_markdown,
+    scan_blocks,
+)
+from copy_static import copy_directory_recursive
+from generation import collect_pages
+from inline_markdown import text_to_text_nodes
+from synthetic_site import SiteConfig, generate_site
+from template import Template
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def inline_texts(blocks):
+    texts = []
+    for block in blocks:
+        match block_to_block_type(block):
+            case BlockType.PARAGRAPH:
+                texts.append(" ".join(block.split("\n")))
+            case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+                texts.extend(line.split(" ", 1)[1] for line in block.split("\n"))
+    return texts
+
+
+def run_stages(root, repeat):
+    content_dir = os.path.join(root, "content")
+    static_dir = os.path.join(root, "static")
+    output_dir = os.path.join(root, "docs")
+    pages = collect_pages(content_dir, output_dir)
+
+    markdowns = []
+    for src_path, _ in pages:
+        with open(src_path) as f:
+            markdowns.append(f.read())
+
+    stages = {}
+
+    def record(name, items, func):
+        seconds, result = best_of(repeat, func)
+        stages[name] = {"seconds": seconds, "items": items}
+        return result
+
+    page_blocks = record(
+        "markdown_to_blocks",
+        len(markdowns),
+        lambda: [markdown_to_blocks(md) for md in markdowns],
+    )
+    all_blocks = [block for blocks in page_blocks for block in blocks]
+    record(
+        "block_to_block_type",
+        len(all_blocks),
+        lambda: [block_to_block_type(block) for block in all_blocks],
+    )
+
+    record(
+        "scan_blocks",
+        len(markdowns),
+        lambda: [scan_blocks(md) for md in markdowns],
+    )
+
+    texts = inline_texts(all_blocks)
+    record(
+        "text_to_text_nodes",
+        len(texts),
+        lambda: [text_to_text_nodes(text) for text in texts],
+    )
+
+    nodes = record(
+        "markdown_to_html_node",
+        len(markdowns),
+        lambda: [markdown_to_html_node(md) for md in markdowns],
+    )
+    html_fragments = record(
+        "to_html", len(nodes), lambda: [node.to_html() for node in nodes]
+    )
+    record(
+        "render_markdown",
+        len(markdowns),
+        lambda: [render_markdown(md) for md in markdowns],
+    )
+
+    with open(os.path.join(root, "template.html")) as f:
+        template = Template.compile(f.read(), "/bench/")
+    documents = record(
+        "template",
+        len(html_fragments),
+        lambda: [
+            template.render(Title="Benchmark", Content=html)
+            for html in html_fragments
+        ],
+    )
+
+    def write_pages():
+        for (_, dest_path), document in zip(pages, documents):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            with open(dest_path, "w") as f:
+                f.write(document)
+
+    record("write", len(documents), write_pages)
+
+    static_output = os.path.join(root, "static-copy")
+    static_files = sum(len(files) for _, _, files in os.walk(static_dir))
+    record(
+        "copy_directory_recursive",
+        static_files,
+        lambda: copy_directory_recursive(static_dir, static_output),
+    )
+    return stages
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    defaults = SiteConfig()
+    parser = argparse.ArgumentParser(
+        description="Time each build stage on a synthetic site and print JSON."
+    )
+    parser.add_argument("--pages", type=int, default=defaults.pages)
+    parser.add_argument("--blocks", type=int, default=defaults.blocks_per_page)
+    parser.add_argument("--words", type=int, default=defaults.paragraph_words)
+    parser.add_argument("--link-density", type=float, default=defaults.link_density)
+    parser.add_argument("--list-ratio", type=float, default=defaults.list_ratio)
+    parser.add_argument("--code-ratio", type=float, default=defaults.code_ratio)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--static-files", type=int, default=defaults.static_files)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = SiteConfig(
+        pages=args.pages,
+        blocks_per_page=args.blocks,
+        paragraph_words=args.words,
+        link_density=args.link_density,
+        list_ratio=args.list_ratio,
+        code_ratio=args.code_ratio,
+        depth=args.depth,
+        static_files=args.static_files,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_site(root, config)
+        stages = run_stages(root, args.repeat)
+
+    report = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "config": config.to_dict(),
+        "repeat": args.repeat,
+        "stages": stages,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,9 +2,13 @@ import re
 from enum import Enum
 
 from htmlnode import LeafNode, ParentNode
-from inline_markdown import text_to_text_nodes
+from inline_markdown import LINK_OR_IMAGE_PATTERN, text_to_html, text_to_text_nodes
 from textnode import TextNode, TextType, text_node_to_html_node
 
+# Bump whenever the HTML produced for the same markdown changes, so cached
+# fragments from an older parser are not reused.
+PARSER_VERSION = 3
+
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -15,6 +19,164 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 
+class Document:
+    __slots__ = ("root", "title", "outline", "word_count")
+
+    def __init__(self, root, title=None, outline=None, word_count=0):
+        self.root = root
+        self.title = title
+        self.outline = outline if outline is not None else []
+        self.word_count = word_count
+
+    def __repr__(self):
+        return f"Document({self.title}, outline: {self.outline}, words: {self.word_count})"
+
+
+def parse_markdown(markdown, texts=None):
+    children_nodes = []
+    title = None
+    outline = []
+    word_count = 0
+
+    for block_type, lines in scan_blocks(markdown):
+        if texts is not None:
+            texts.append(block_text(block_type, lines))
+        if block_type == BlockType.HEADING:
+            level, content = parse_heading(lines[0])
+            outline.append((level, content))
+            if level == 1 and title is None:
+                title = content
+            children_nodes.append(ParentNode(f"h{level}", text_to_children(content)))
+        else:
+            children_nodes.append(block_to_html_node(block_type, lines))
+        word_count += block_word_count(block_type, lines)
+
+    return Document(ParentNode("div", children_nodes), title, outline, word_count)
+
+
+def render_markdown(markdown, basepath="/", assets=None):
+    return render_document(markdown, basepath, assets).root
+
+
+def render_document(markdown, basepath="/", assets=None, texts=None):
+    # The same Document parse_markdown returns, but with root holding the HTML
+    # its node tree would render to, written straight from the scanned blocks
+    # without TextNode or HTMLNode objects in between. Given a list, texts
+    # also collects each block's block_text on the same pass.
+    parts = []
+    title = None
+    outline = []
+    word_count = 0
+
+    for block_type, lines in iter_blocks(markdown.split("\n")):
+        if texts is not None:
+            texts.append(block_text(block_type, lines))
+        if block_type == BlockType.HEADING:
+            level, content = parse_heading(lines[0])
+            outline.append((level, content))
+            if level == 1 and title is None:
+                title = content
+            parts.append(render_inline_element(f"h{level}", content, basepath, assets))
+        else:
+            parts.append(render_block(block_type, lines, basepath, assets))
+        word_count += block_word_count(block_type, lines)
+
+    if not parts:
+        raise ValueError("No child nodes provided")
+    html = "<div>" + "".join(parts) + "</div>"
+    return Document(html, title, outline, word_count)
+
+
+def render_block(block_type, lines, basepath="/", assets=None):
+    if block_type == BlockType.CODE:
+        return "<pre><code>" + "\n".join(lines[1:-1]) + "\n</code></pre>"
+    texts = block_inline_texts(block_type, lines)
+    match block_type:
+        case BlockType.PARAGRAPH:
+            return render_inline_element("p", " ".join(texts), basepath, assets)
+        case BlockType.HEADING:
+            level = parse_heading(lines[0])[0]
+            return render_inline_element(f"h{level}", texts[0], basepath, assets)
+        case BlockType.UNORDERED_LIST:
+            items = [
+                render_inline_element("li", text, basepath, assets) for text in texts
+            ]
+            return "<ul>" + "".join(items) + "</ul>"
+        case BlockType.ORDERED_LIST:
+            items = [
+                render_inline_element("li", text, basepath, assets) for text in texts
+            ]
+            return "<ol>" + "".join(items) + "</ol>"
+        case BlockType.QUOTE:
+            content = " ".join(texts)
+            return render_inline_element("blockquote", content, basepath, assets)
+
+        case _:
+            raise Exception("Invalid block type")
+
+
+def render_inline_element(tag, text, basepath="/", assets=None):
+    inner = text_to_html(text, basepath, assets)
+    # Raised where a ParentNode without children would fail to render.
+    if not inner:
+        raise ValueError("No child nodes provided")
+    return f"<{tag}>{inner}</{tag}>"
+
+
+def block_word_count(block_type, lines):
+    # Counts whitespace separated words of the source, leaving out block
+    # markers such as "#", "-" and "1." and skipping code entirely.
+    match block_type:
+        case BlockType.CODE:
+            return 0
+        case BlockType.PARAGRAPH:
+            return sum(len(line.split()) for line in lines)
+        case BlockType.QUOTE:
+            return sum(len(line.lstrip(">").split()) for line in lines)
+        case BlockType.HEADING:
+            return len(lines[0].split()) - 1
+        case _:
+            return sum(len(line.split()) - 1 for line in lines)
+
+
+def block_inline_texts(block_type, lines):
+    # The inline markdown of each source line, with its block marker stripped.
+    # Paragraph and quote lines are joined with spaces into one element, list
+    # lines become one item each, and a heading is its single line.
+    match block_type:
+        case BlockType.HEADING:
+            return [parse_heading(lines[0])[1]]
+        case BlockType.QUOTE:
+            return [line.lstrip(">").lstrip() for line in lines]
+        case BlockType.UNORDERED_LIST:
+            return [line.lstrip("- ") for line in lines]
+        case BlockType.ORDERED_LIST:
+            return [line.lstrip(f"{i}. ") for i, line in enumerate(lines, 1)]
+        case BlockType.CODE:
+            raise ValueError("code blocks have no inline markdown")
+        case _:
+            return lines
+
+
+def block_text(block_type, lines):
+    # The words a reader sees, without block markers or link targets but with
+    # link text, alt text and code kept.
+    if block_type == BlockType.CODE:
+        text = "\n".join(lines[1:-1])
+    else:
+        text = "\n".join(block_inline_texts(block_type, lines))
+    if "](" in text:
+        text = LINK_OR_IMAGE_PATTERN.sub(r" \2 ", text)
+    return text
+
+
+def document_title(document, markdown):
+    if document.title is not None:
+        return document.title
+    # Pages whose only H1 line sits inside another block need the full scan.
+    return extract_title(markdown)
+
+
 def extract_title(markdown):
     lines = markdown.split("\n")
     for line in lines:
@@ -24,89 +186,192 @@ def extract_title(markdown):
 
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    children_nodes = []
+    children_nodes = [
+        block_to_html_node(block_type, lines)
+        for block_type, lines in scan_blocks(markdown)
+    ]
+    return ParentNode("div", children_nodes)
 
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
-            case BlockType.PARAGRAPH:
-                node = paragraph_to_html_node(block)
-            case BlockType.HEADING:
-                node = heading_to_html_node(block)
-            case BlockType.CODE:
-                node = code_block_to_html_node(block)
-            case BlockType.UNORDERED_LIST:
-                node = ulist_to_html_node(block)
-            case BlockType.ORDERED_LIST:
-                node = olist_to_html_node(block)
-            case BlockType.QUOTE:
-                node = quote_block_to_html_node(block)
-
-            case _:
-                raise Exception("Invalid block type")
-
-        children_nodes.append(node)
 
+def markdown_to_html_node_multipass(markdown):
+    children_nodes = []
+    for block in markdown_to_blocks(markdown):
+        block_type = block_to_block_type(block)
+        children_nodes.append(block_to_html_node(block_type, block.split("\n")))
     return ParentNode("div", children_nodes)
 
 
+def block_to_html_node(block_type, lines):
+    match block_type:
+        case BlockType.PARAGRAPH:
+            return paragraph_to_html_node(lines)
+        case BlockType.HEADING:
+            return heading_to_html_node(lines)
+        case BlockType.CODE:
+            return code_block_to_html_node(lines)
+        case BlockType.UNORDERED_LIST:
+            return ulist_to_html_node(lines)
+        case BlockType.ORDERED_LIST:
+            return olist_to_html_node(lines)
+        case BlockType.QUOTE:
+            return quote_block_to_html_node(lines)
+
+        case _:
+            raise Exception("Invalid block type")
+
+
 def text_to_children(text):
     text_nodes = text_to_text_nodes(text)
     children = [text_node_to_html_node(node) for node in text_nodes]
     return children
 
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
-    content = " ".join(lines)
+def paragraph_to_html_node(lines):
+    content = " ".join(block_inline_texts(BlockType.PARAGRAPH, lines))
     children = text_to_children(content)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
-    match = re.match(r"^(#{1,6})\s(.*)", block)
-    level = len(match.group(1))
-    content = match.group(2).strip()
-    children = text_to_children(content)
+def heading_to_html_node(lines):
+    level = parse_heading(lines[0])[0]
+    children = text_to_children(block_inline_texts(BlockType.HEADING, lines)[0])
     return ParentNode(f"h{level}", children)
 
 
-def code_block_to_html_node(block):
-    content = "\n".join(block.split("\n")[1:-1]) + "\n"
+def parse_heading(line):
+    match = re.match(r"^(#{1,6})\s(.*)", line)
+    return len(match.group(1)), match.group(2).strip()
+
+
+def code_block_to_html_node(lines):
+    content = "\n".join(lines[1:-1]) + "\n"
     code_text_node = TextNode(content, TextType.TEXT)
     code_html_node = LeafNode("code", code_text_node.text)
     return ParentNode("pre", [code_html_node])
 
 
-def quote_block_to_html_node(block):
-    lines = block.split("\n")
-    processed_lines = [line.lstrip(">").lstrip() for line in lines]
-    content = " ".join(processed_lines)
+def quote_block_to_html_node(lines):
+    content = " ".join(block_inline_texts(BlockType.QUOTE, lines))
     children = text_to_children(content)
     return ParentNode("blockquote", children)
 
 
-def ulist_to_html_node(block):
-    lines = block.split("\n")
+def ulist_to_html_node(lines):
     list_items = []
-    for line in lines:
-        item_content = line.lstrip("- ")
+    for item_content in block_inline_texts(BlockType.UNORDERED_LIST, lines):
         item_children = text_to_children(item_content)
         list_items.append(ParentNode("li", item_children))
     return ParentNode("ul", list_items)
 
 
-def olist_to_html_node(block):
-    lines = block.split("\n")
+def olist_to_html_node(lines):
     list_items = []
-    for i, line in enumerate(lines, 1):
-        item_content = line.lstrip(f"{i}. ")
+    for item_content in block_inline_texts(BlockType.ORDERED_LIST, lines):
         item_children = text_to_children(item_content)
         list_items.append(ParentNode("li", item_children))
     return ParentNode("ol", list_items)
 
 
+def scan_blocks(markdown):
+    return list(iter_blocks(markdown.split("\n")))
+
+
+def iter_lines(f):
+    # Lines as markdown.split("\n") would give them, read one at a time.
+    for line in f:
+        yield line[:-1] if line.endswith("\n") else line
+
+
+def iter_blocks(lines, fences=True):
+    # Works on any iterable of lines, so a file can be parsed while holding
+    # no more than the block being collected.
+    lines = iter(lines)
+    group = None
+
+    for line in lines:
+        if not line or line.isspace():
+            if group is not None:
+                yield group.finish()
+                group = None
+            continue
+
+        if group is not None:
+            group.append(line)
+            continue
+
+        if not fences or "```" not in line or not is_fence_opening(line):
+            group = LineGroup(line)
+            continue
+        code_lines = [line]
+        for code_line in lines:
+            code_lines.append(code_line)
+            if code_line.rstrip().endswith("```"):
+                break
+        else:
+            # Never closed, so the fence and everything after it are read as
+            # regular blocks, where no later fence can close either.
+            yield from iter_blocks(code_lines, fences=False)
+            return
+        code_lines[0] = code_lines[0].lstrip()
+        code_lines[-1] = code_lines[-1].rstrip()
+        yield BlockType.CODE, code_lines
+
+    if group is not None:
+        yield group.finish()
+
+
+def is_fence_opening(line):
+    opening = line.strip()
+    # A fence closed on its own line is left to the regular block rules.
+    return opening.startswith("```") and not (
+        len(opening) > 3 and opening.endswith("```")
+    )
+
+
+class LineGroup:
+    # Collects the lines of one blank-line separated block and classifies them
+    # as they arrive. The last line is only checked once it is known to be
+    # last, because it gets stripped of trailing whitespace like the old
+    # split-based blocks were.
+    __slots__ = ("lines", "is_quote", "is_unordered", "is_ordered")
+
+    def __init__(self, first_line):
+        self.lines = [first_line.lstrip()]
+        self.is_quote = True
+        self.is_unordered = True
+        self.is_ordered = True
+
+    def append(self, line):
+        if self.is_quote or self.is_unordered or self.is_ordered:
+            self.check(self.lines[-1], len(self.lines))
+        self.lines.append(line)
+
+    def check(self, line, number):
+        if self.is_quote and not line.startswith(">"):
+            self.is_quote = False
+        if self.is_unordered and not line.startswith("- "):
+            self.is_unordered = False
+        if self.is_ordered and not line.startswith(f"{number}. "):
+            self.is_ordered = False
+
+    def finish(self):
+        lines = self.lines
+        lines[-1] = lines[-1].rstrip()
+        self.check(lines[-1], len(lines))
+
+        if re.match(r"^#{1,6}\s", lines[0]):
+            return BlockType.HEADING, lines
+        if lines[0].startswith("```") and lines[-1].endswith("```"):
+            return BlockType.CODE, lines
+        if self.is_quote:
+            return BlockType.QUOTE, lines
+        if self.is_unordered:
+            return BlockType.UNORDERED_LIST, lines
+        if self.is_ordered:
+            return BlockType.ORDERED_LIST, lines
+        return BlockType.PARAGRAPH, lines
+
+
 def markdown_to_blocks(markdown):
     blocks = [block.strip() for block in markdown.split("\n\n") if block]
     return blocks
@@ -0,0 +1,152 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from copy_static import remove_empty_parents, walk_files
+from manifest import load_manifest, save_manifest
+
+try:
+    from compression.zstd import compress as zstd_compress
+except ImportError:
+    try:
+        from zstandard import compress as zstd_compress
+    except ImportError:
+        zstd_compress = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    ".html",
+    ".css",
+    ".js",
+    ".json",
+    ".svg",
+    ".txt",
+    ".xml",
+)
+
+
+def gzip_encode(data):
+    # A fixed mtime keeps the output reproducible between builds.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def zstd_encode(data):
+    return zstd_compress(data, level=19)
+
+
+def available_encoders():
+    encoders = {".gz": gzip_encode}
+    if zstd_compress is not None:
+        encoders[".zst"] = zstd_encode
+    return encoders
+
+
+def compress_outputs(dest, jobs=1, encoders=None, manifest=None):
+    owns_manifest = manifest is None
+    if owns_manifest:
+        manifest = load_manifest(dest)
+    if encoders is None:
+        encoders = available_encoders()
+
+    # Sidecars are recorded as they are written, so a static file that only
+    # looks like one, such as data.json.gz, is never touched.
+    previous = manifest["sidecars"]
+    current = {}
+    for sidecar, source in previous.items():
+        if sidecar in manifest["assets"]:
+            continue
+        path = os.path.join(dest, sidecar)
+        source_path = os.path.join(dest, source)
+        extension = os.path.splitext(sidecar)[1]
+        # Sidecars nothing will refresh must not outlive their source.
+        if not os.path.exists(source_path) or (
+            extension not in encoders and not is_sidecar_current(path, source_path)
+        ):
+            remove_sidecar(path, dest)
+        elif extension not in encoders:
+            current[sidecar] = source
+
+    pending = []
+    for rel_path in walk_files(dest):
+        if not is_compressible(rel_path):
+            continue
+
+        path = os.path.join(dest, rel_path)
+        stale = []
+        for extension, encode in encoders.items():
+            sidecar = rel_path + extension
+            if sidecar in manifest["assets"]:
+                continue
+            current[sidecar] = rel_path
+            if sidecar not in previous or not is_sidecar_current(
+                path + extension, path
+            ):
+                stale.append((extension, encode))
+        if stale:
+            pending.append((path, stale))
+
+    # zlib and zstd release the GIL, so threads compress in parallel without
+    # the cost of shipping file contents to worker processes.
+    written = []
+    if jobs <= 1 or len(pending) <= 1:
+        for job in pending:
+            written.extend(compress_file(job))
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for sidecars in pool.map(compress_file, pending):
+                written.extend(sidecars)
+
+    manifest["sidecars"] = current
+    if owns_manifest:
+        save_manifest(dest, manifest)
+    return written
+
+
+def compress_file(job):
+    path, encoders = job
+    with open(path, "rb") as f:
+        data = f.read()
+    stat = os.stat(path)
+
+    written = []
+    for extension, encode in encoders:
+        sidecar_path = path + extension
+        tmp_path = sidecar_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encode(data))
+        # The sidecar carries its source's mtime, which marks it up to date.
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, sidecar_path)
+        written.append(sidecar_path)
+    return written
+
+
+def remove_sidecars(dest, manifest=None):
+    owns_manifest = manifest is None
+    if owns_manifest:
+        manifest = load_manifest(dest)
+    if not manifest["sidecars"]:
+        return
+
+    for sidecar in manifest["sidecars"]:
+        remove_sidecar(os.path.join(dest, sidecar), dest)
+    manifest["sidecars"] = {}
+    if owns_manifest:
+        save_manifest(dest, manifest)
+
+
+def is_compressible(path):
+    name = os.path.basename(path)
+    return not name.startswith(".") and name.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def is_sidecar_current(sidecar_path, source_path):
+    try:
+        return os.stat(sidecar_path).st_mtime_ns == os.stat(source_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def remove_sidecar(path, dest):
+    if os.path.exists(path):
+        os.remove(path)
+        remove_empty_parents(path, dest)
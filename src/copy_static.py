@@ -1,15 +1,18 @@
+import contextlib
 import os
 import shutil
 
+from manifest import asset_entry, hash_file, load_manifest, save_manifest
 
-def copy_directory_recursive(src, dest):
+
+def copy_directory_recursive(src, dest, clean=True):
     if not os.path.exists(src):
         raise FileNotFoundError(f"Source directory not found: {src}")
 
-    if os.path.exists(dest):
+    if clean and os.path.exists(dest):
         shutil.rmtree(dest)
 
-    os.mkdir(dest)
+    os.makedirs(dest, exist_ok=True)
 
     for item in os.listdir(src):
         src_path = os.path.join(src, item)
@@ -18,4 +21,150 @@ def copy_directory_recursive(src, dest):
         if os.path.isfile(src_path):
             shutil.copy(src_path, dest_path)
         elif os.path.isdir(src_path):
-            copy_directory_recursive(src_path, dest_path)
+            copy_directory_recursive(src_path, dest_path, clean)
+
+
+def sync_directory(src, dest, use_hash=False, manifest=None, optimizers=()):
+    if not os.path.exists(src):
+        raise FileNotFoundError(f"Source directory not found: {src}")
+
+    # Callers holding the manifest in memory save it themselves.
+    owns_manifest = manifest is None
+    if owns_manifest:
+        manifest = load_manifest(dest)
+    previous_assets = manifest["assets"]
+    current_assets = {}
+    copied = []
+
+    for rel_path in walk_files(src):
+        src_path = os.path.join(src, rel_path)
+        dest_path = os.path.join(dest, rel_path)
+        stat = os.stat(src_path)
+        previous = previous_assets.get(rel_path)
+        pipeline, optimizer = select_optimizer(optimizers, rel_path)
+
+        if (
+            previous is not None
+            and previous.get("pipeline") == pipeline
+            and is_copy_intact(dest_path, previous)
+        ):
+            if is_same_stat(previous, stat):
+                current_assets[rel_path] = previous
+                continue
+            if use_hash and previous.get("hash") and previous["size"] == stat.st_size:
+                content_hash = hash_file(src_path)
+                if content_hash == previous["hash"]:
+                    # Touched but not modified, only refresh the recorded stat.
+                    current_assets[rel_path] = {
+                        **previous,
+                        **asset_entry(stat, content_hash),
+                    }
+                    continue
+
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        # Swapped in whole, like replacing_file.
+        tmp_path = dest_path + ".tmp"
+        if pipeline is None:
+            shutil.copy2(src_path, tmp_path)
+        else:
+            optimizer.optimize(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        copied.append(dest_path)
+        content_hash = hash_file(src_path) if use_hash else None
+        entry = asset_entry(stat, content_hash)
+        if pipeline is not None:
+            entry["pipeline"] = pipeline
+            entry["output_size"] = os.path.getsize(dest_path)
+        current_assets[rel_path] = entry
+
+    removed = []
+    for rel_path in previous_assets:
+        if rel_path in current_assets:
+            continue
+        dest_path = os.path.join(dest, rel_path)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+            remove_empty_parents(dest_path, dest)
+            removed.append(dest_path)
+
+    unchanged = len(current_assets) - len(copied)
+    print(
+        f"Synced static files: {len(copied)} copied, {len(removed)} removed, {unchanged} unchanged"
+    )
+
+    manifest["assets"] = current_assets
+    if owns_manifest:
+        save_manifest(dest, manifest)
+    return copied, removed
+
+
+def select_optimizer(optimizers, rel_path):
+    for optimizer in optimizers:
+        pipeline = optimizer.pipeline_for(rel_path)
+        if pipeline is not None:
+            return pipeline, optimizer
+    return None, None
+
+
+def walk_files(root):
+    rel_paths = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            full_path = os.path.join(dir_path, file_name)
+            rel_paths.append(os.path.relpath(full_path, root))
+    return rel_paths
+
+
+def is_same_stat(entry, stat):
+    return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+
+def is_copy_intact(dest_path, entry):
+    try:
+        return os.path.getsize(dest_path) == entry.get("output_size", entry["size"])
+    except OSError:
+        return False
+
+
+@contextlib.contextmanager
+def replacing_file(path, mode="w"):
+    # Written beside the target and swapped in whole. Every writer in the
+    # build replaces files this way instead of rewriting them in place, which
+    # is what lets the staged tree and fingerprinted names share inodes with
+    # the published files: a hardlinked copy is never truncated under a reader.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        # Identical output keeps the old file and its mtime, so rsync, CDN
+        # purges and the compressed sidecars all see it as unchanged.
+        if os.path.isfile(path) and is_same_content(tmp_path, path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def is_same_content(path, other_path, chunk_size=1024 * 1024):
+    if os.path.getsize(path) != os.path.getsize(other_path):
+        return False
+    with open(path, "rb") as f, open(other_path, "rb") as other:
+        while True:
+            chunk = f.read(chunk_size)
+            if chunk != other.read(chunk_size):
+                return False
+            if not chunk:
+                return True
+
+
+def remove_empty_parents(path, root):
+    # Drop directories left empty by a removal, but never the root itself.
+    root = os.path.abspath(root)
+    parent = os.path.dirname(os.path.abspath(path))
+    while parent != root and parent.startswith(root) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+
+from copy_static import is_same_stat, remove_empty_parents, replacing_file
+from manifest import asset_entry, hash_bytes, hash_file, load_manifest, save_manifest
+
+ASSET_MANIFEST_FILENAME = "asset-manifest.json"
+FINGERPRINT_LENGTH = 10
+
+
+def fingerprint_assets(dest, manifest=None):
+    owns_manifest = manifest is None
+    if owns_manifest:
+        manifest = load_manifest(dest)
+
+    previous = manifest["fingerprints"]
+    current = {}
+
+    for rel_path in sorted(manifest["assets"]):
+        path = os.path.join(dest, rel_path)
+        stat = os.stat(path)
+        entry = previous.get(rel_path)
+        if entry is not None and is_same_stat(entry, stat):
+            content_hash = entry["hash"]
+        else:
+            content_hash = hash_file(path)
+
+        fingerprinted = fingerprinted_path(rel_path, content_hash)
+        fingerprinted_full_path = os.path.join(dest, fingerprinted)
+        if not os.path.exists(fingerprinted_full_path):
+            link_or_copy(path, fingerprinted_full_path)
+        if entry is not None and entry["path"] != fingerprinted:
+            remove_fingerprinted(dest, entry["path"])
+
+        current[rel_path] = asset_entry(stat, content_hash)
+        current[rel_path]["path"] = fingerprinted
+
+    for rel_path, entry in previous.items():
+        if rel_path not in current:
+            remove_fingerprinted(dest, entry["path"])
+
+    manifest["fingerprints"] = current
+    assets = asset_map(current)
+    write_asset_manifest(dest, assets)
+    if owns_manifest:
+        save_manifest(dest, manifest)
+    return assets
+
+
+def remove_fingerprints(dest, manifest=None):
+    owns_manifest = manifest is None
+    if owns_manifest:
+        manifest = load_manifest(dest)
+    if not manifest["fingerprints"]:
+        return
+
+    for entry in manifest["fingerprints"].values():
+        remove_fingerprinted(dest, entry["path"])
+    manifest["fingerprints"] = {}
+
+    asset_manifest_path = os.path.join(dest, ASSET_MANIFEST_FILENAME)
+    if os.path.exists(asset_manifest_path):
+        os.remove(asset_manifest_path)
+    if owns_manifest:
+        save_manifest(dest, manifest)
+
+
+def asset_map(fingerprints):
+    return {
+        url_path(rel_path): url_path(entry["path"])
+        for rel_path, entry in sorted(fingerprints.items())
+    }
+
+
+def fingerprinted_path(rel_path, content_hash):
+    root, extension = os.path.splitext(rel_path)
+    return f"{root}.{content_hash[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def url_path(rel_path):
+    return "/" + rel_path.replace(os.sep, "/")
+
+
+def assets_hash(assets, urls=None):
+    if not assets:
+        return None
+    if urls is not None:
+        # Scoped to the URLs a page links to, so other assets can change
+        # without marking it stale.
+        assets = {url: assets.get(url) for url in urls}
+    return hash_bytes(json.dumps(assets, sort_keys=True).encode())
+
+
+def link_or_copy(src_path, dest_path):
+    try:
+        os.link(src_path, dest_path)
+    except OSError:
+        shutil.copy2(src_path, dest_path)
+
+
+def remove_fingerprinted(dest, rel_path):
+    path = os.path.join(dest, rel_path)
+    if os.path.exists(path):
+        os.remove(path)
+        remove_empty_parents(path, dest)
+
+
+def write_asset_manifest(dest, assets):
+    path = os.path.join(dest, ASSET_MANIFEST_FILENAME)
+    with replacing_file(path) as f:
+        json.dump(assets, f, indent=2, sort_keys=True)
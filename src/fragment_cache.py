@@ -0,0 +1,142 @@
+import json
+import os
+
+from block_markdown import (
+    PARSER_VERSION,
+    document_title,
+    parse_markdown,
+    render_document,
+)
+from images import add_image_attributes
+from inline_markdown import extract_markdown_images
+from manifest import hash_bytes
+from search import page_terms
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "fragments")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Fragments are rendered with this stand-in for the basepath and stored split
+# around it, so any basepath can be filled in with a single join.
+BASEPATH_SLOT = "\x00"
+
+
+class FragmentCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            with open(path, "r") as f:
+                fragment = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # The mtime doubles as the last-used time for eviction.
+        os.utime(path)
+        return fragment
+
+    def put(self, key, fragment):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(fragment, f)
+        os.replace(tmp_path, path)
+
+    def prune(self):
+        entries = []
+        total = 0
+        for dir_path, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+def fragment_key(markdown, images=None):
+    key = f"{PARSER_VERSION}\0{markdown}"
+    if images is not None:
+        # Only the sizes of images this page references end up in its HTML.
+        referenced = [
+            (url, images.get(url)) for _, url in extract_markdown_images(markdown)
+        ]
+        key += "\0" + json.dumps(referenced)
+    return hash_bytes(key.encode())
+
+
+def parse_fragment(markdown, images=None, texts=None):
+    document = parse_markdown(markdown, texts)
+    if images is not None:
+        add_image_attributes(document.root, images)
+    return document
+
+
+def render_fragment(markdown, basepath="/", assets=None, images=None, texts=None):
+    # Size hints are added to the node tree, so only pages without them can
+    # be written straight to HTML.
+    if images is None:
+        return render_document(markdown, basepath, assets, texts)
+    document = parse_fragment(markdown, images, texts)
+    document.root = document.root.to_html(basepath, assets)
+    return document
+
+
+def cached_fragment(
+    cache, markdown, basepath="/", assets=None, images=None, terms=None
+):
+    # Given a Counter, terms is updated with the page's search terms, which
+    # the cache keeps alongside the HTML once a search build has asked.
+    texts = [] if terms is not None else None
+    if BASEPATH_SLOT in markdown:
+        document = render_fragment(markdown, basepath, assets, images, texts)
+        if texts is not None:
+            terms.update(page_terms(texts))
+        return document_title(document, markdown), document.root
+
+    key = fragment_key(markdown, images)
+    fragment = cache.get(key)
+    if fragment is None or (texts is not None and "terms" not in fragment):
+        document = render_fragment(markdown, BASEPATH_SLOT, None, images, texts)
+        fragment = {
+            "title": document_title(document, markdown),
+            "outline": document.outline,
+            "word_count": document.word_count,
+            "parts": document.root.split(BASEPATH_SLOT),
+        }
+        if texts is not None:
+            fragment["terms"] = page_terms(texts)
+        cache.put(key, fragment)
+    if terms is not None:
+        terms.update(fragment["terms"])
+    return fragment["title"], fill_basepath(fragment["parts"], basepath, assets)
+
+
+def fill_basepath(parts, basepath, assets=None):
+    if not assets:
+        return basepath.join(parts)
+
+    # Every part after the first starts with a site-root path minus its
+    # leading slash, up to the closing quote of the attribute.
+    filled = [parts[0]]
+    for part in parts[1:]:
+        end = part.find('"')
+        url = assets.get("/" + part[:end])
+        if url is not None:
+            part = url[1:] + part[end:]
+        filled.append(basepath)
+        filled.append(part)
+    return "".join(filled)
@@ -1,55 +1,386 @@
+import contextlib
 import os
 import pathlib
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-from block_markdown import extract_title, markdown_to_html_node
+from block_markdown import (
+    BlockType,
+    block_text,
+    block_to_html_node,
+    document_title,
+    iter_blocks,
+    iter_lines,
+    parse_heading,
+    render_block,
+    render_document,
+)
+from copy_static import remove_empty_parents, replacing_file
+from fingerprint import assets_hash
+from fragment_cache import cached_fragment, parse_fragment
+from images import add_image_attributes, images_hash
+from manifest import (
+    hash_file,
+    is_page_current,
+    load_manifest,
+    page_entry,
+    save_manifest,
+)
+from search import SearchIndex, page_terms, remove_search_index, text_terms
+from template import load_template, template_references
 
+# Pages larger than this are parsed and written one block at a time, so
+# memory tracks the largest block instead of the whole document.
+STREAM_THRESHOLD_BYTES = 16 * 1024 * 1024
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
-    print(
+# The URL half of a markdown link or image, so link text wrapped from an
+# earlier line doesn't hide it.
+REFERENCE_PATTERN = re.compile(r"\]\(([^\(\)]*)\)")
+
+
+def generate_page(
+    from_path,
+    template_path,
+    dest_path,
+    basepath="/",
+    log=print,
+    template=None,
+    cache=None,
+    images=None,
+    search=False,
+    stage=None,
+):
+    log(
         f"Generating page from {from_path} to {dest_path} using {template_path} (basepath: {basepath})"
     )
 
-    with open(from_path, "r") as md:
-        markdown_content = md.read()
+    if template is None:
+        template = load_template(template_path, basepath)
+
+    # The profiler passes a stage timer; a normal build times nothing.
+    if stage is None:
+        stage = no_stage
+
+    if os.path.getsize(from_path) > STREAM_THRESHOLD_BYTES:
+        with stage("stream"):
+            return stream_page(from_path, dest_path, template, images, search)
+
+    with stage("read"):
+        with open(from_path, "r") as md:
+            markdown_content = md.read()
+
+    # The words for search are collected on the same pass over the blocks
+    # that renders them, or come from the fragment cache.
+    texts = [] if search else None
+    terms = None
+    if cache is None and images is None:
+        # No node tree needed, so render the markdown straight to HTML.
+        with stage("render"):
+            document = render_document(
+                markdown_content, template.basepath, template.assets, texts
+            )
+            title = document_title(document, markdown_content)
+        content = document.root
+    elif cache is None:
+        with stage("node_construction"):
+            document = parse_fragment(markdown_content, images, texts)
+            title = document_title(document, markdown_content)
+        content = document.root
+    else:
+        terms = Counter() if search else None
+        with stage("cache"):
+            title, content = cached_fragment(
+                cache, markdown_content, basepath, template.assets, images, terms
+            )
+
+    with stage("write"):
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+
+        with replacing_file(dest_path) as html:
+            template.write(html, Title=title, Content=content)
+    if terms is None and texts is not None:
+        terms = page_terms(texts)
+    return title, terms
 
-    with open(template_path, "r") as template:
-        template_content = template.read()
 
-    html_content_string = markdown_to_html_node(markdown_content).to_html()
+def no_stage(name):
+    return contextlib.nullcontext()
 
-    title = extract_title(markdown_content)
 
-    final_html = template_content.replace("{{ Title }}", title)
-    final_html = final_html.replace("{{ Content }}", html_content_string)
+def stream_page(from_path, dest_path, template, images=None, search=False):
+    title = stream_title(from_path)
+    basepath = template.basepath
+    assets = template.assets
+    terms = Counter() if search else None
 
-    final_html = final_html.replace('href="/', 'href="' + basepath)
-    final_html = final_html.replace('src="/', 'src="' + basepath)
+    def write_content(write):
+        eager_images = 1
+        write("<div>")
+        with open(from_path, "r") as md:
+            for block_type, lines in iter_blocks(iter_lines(md)):
+                if terms is not None:
+                    terms.update(text_terms(block_text(block_type, lines)))
+                if images is None:
+                    write(render_block(block_type, lines, basepath, assets))
+                    continue
+                node = block_to_html_node(block_type, lines)
+                eager_images = add_image_attributes(node, images, eager_images)
+                node.emit_html(write, basepath, assets)
+        write("</div>")
 
     dest_dir = os.path.dirname(dest_path)
     if dest_dir:
         os.makedirs(dest_dir, exist_ok=True)
 
-    with open(dest_path, "w") as html:
-        html.write(final_html)
+    with replacing_file(dest_path) as html:
+        template.write(html, Title=title, Content=write_content)
+    return title, terms
 
 
-def generate_pages_recursive(
-    dir_path_content, template_path, dest_dir_path, basepath="/"
-):
-    if not os.path.exists(dest_dir_path):
-        os.makedirs(dest_dir_path)
+def stream_title(from_path):
+    # The title slot comes before the content, so it takes a pass of its own.
+    with open(from_path, "r") as md:
+        for block_type, lines in iter_blocks(iter_lines(md)):
+            if block_type == BlockType.HEADING:
+                level, content = parse_heading(lines[0])
+                if level == 1:
+                    return content
+    with open(from_path, "r") as md:
+        for line in iter_lines(md):
+            if line.startswith("# "):
+                return line[2:].strip()
+    raise ValueError("No H1 header found in markdown content")
 
-    for item in os.listdir(dir_path_content):
+
+def collect_pages(dir_path_content, dest_dir_path):
+    pages = []
+    for item in sorted(os.listdir(dir_path_content)):
         src_item_path = os.path.join(dir_path_content, item)
         dest_item_path = os.path.join(dest_dir_path, item)
 
         if os.path.isfile(src_item_path):
             if item.endswith(".md"):
-                dest_html_path = pathlib.Path(dest_item_path).with_suffix(".html")
-                generate_page(
-                    src_item_path, template_path, str(dest_html_path), basepath
-                )
+                pages.append((src_item_path, page_output_path(dest_item_path)))
         elif os.path.isdir(src_item_path):
-            generate_pages_recursive(
-                src_item_path, template_path, dest_item_path, basepath
+            pages.extend(collect_pages(src_item_path, dest_item_path))
+    return pages
+
+
+def page_output_path(dest_item_path):
+    return str(pathlib.Path(dest_item_path).with_suffix(".html"))
+
+
+def page_references(src_path):
+    # Read a line at a time, so very large pages stay out of memory. URLs
+    # inside code count too, which at worst costs a needless rebuild.
+    references = set()
+    with open(src_path, "r") as md:
+        for line in md:
+            if "](" in line:
+                references.update(REFERENCE_PATTERN.findall(line))
+    return references
+
+
+def page_hashes(src_path, assets, images, template_urls):
+    # A page's HTML only changes with the assets it or the template links to,
+    # and with the sizes of the images it shows.
+    if not assets and images is None:
+        return None, None
+    references = page_references(src_path)
+    return (
+        assets_hash(assets, references | template_urls),
+        images_hash(images, references),
+    )
+
+
+def generate_pages(
+    pages,
+    template_path,
+    basepath="/",
+    *,
+    jobs=1,
+    profiler=None,
+    cache=None,
+    assets=None,
+    images=None,
+    minify=False,
+    search_index=None,
+):
+    if not pages:
+        return
+    template = load_template(template_path, basepath, assets, minify)
+    search = search_index is not None
+
+    # Profiling runs serially so stage timings aren't skewed by contention.
+    if profiler is not None:
+        for src_path, dest_path in pages:
+            print(f"Profiling page {src_path} -> {dest_path}")
+            title, terms = profiler.profile_page(
+                src_path,
+                template,
+                dest_path,
+                basepath,
+                cache=cache,
+                images=images,
+                search=search,
             )
+            if search:
+                search_index.add_page(src_path, dest_path, title, terms)
+        return
+
+    if jobs <= 1 or len(pages) <= 1:
+        for src_path, dest_path in pages:
+            title, terms = generate_page(
+                src_path,
+                template_path,
+                dest_path,
+                basepath,
+                template=template,
+                cache=cache,
+                images=images,
+                search=search,
+            )
+            if search:
+                search_index.add_page(src_path, dest_path, title, terms)
+        return
+
+    jobs_args = [
+        (src_path, template_path, dest_path, basepath) for src_path, dest_path in pages
+    ]
+    chunksize = max(1, len(pages) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(template, cache, images, search),
+    ) as pool:
+        # map() yields results in submission order, so the log stays
+        # deterministic no matter which worker finishes first.
+        results = pool.map(_generate_page_job, jobs_args, chunksize=chunksize)
+        for (src_path, dest_path), (messages, title, terms) in zip(pages, results):
+            for message in messages:
+                print(message)
+            if search:
+                search_index.add_page(src_path, dest_path, title, terms)
+
+
+# Compiled once per worker process by the pool initializer.
+_worker_template = None
+_worker_cache = None
+_worker_images = None
+_worker_search = False
+
+
+def _init_worker(template, cache, images, search):
+    global _worker_template, _worker_cache, _worker_images, _worker_search
+    _worker_template = template
+    _worker_cache = cache
+    _worker_images = images
+    _worker_search = search
+
+
+def _generate_page_job(args):
+    messages = []
+    title, terms = generate_page(
+        *args,
+        log=messages.append,
+        template=_worker_template,
+        cache=_worker_cache,
+        images=_worker_images,
+        search=_worker_search,
+    )
+    return messages, title, terms
+
+
+def generate_pages_incremental(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath="/",
+    *,
+    jobs=1,
+    profiler=None,
+    cache=None,
+    assets=None,
+    images=None,
+    minify=False,
+    search=False,
+):
+    manifest = load_manifest(dest_dir_path)
+    previous_pages = manifest["pages"]
+    template_hash = hash_file(template_path)
+    template_urls = template_references(template_path) if assets else set()
+    search_index = None
+    if search:
+        search_index = SearchIndex(dest_dir_path, manifest, basepath)
+    else:
+        remove_search_index(dest_dir_path, manifest)
+
+    current_pages = {}
+    stale_pages = []
+    for src_path, dest_path in collect_pages(dir_path_content, dest_dir_path):
+        page_assets_hash, page_images_hash = page_hashes(
+            src_path, assets, images, template_urls
+        )
+        entry = page_entry(
+            hash_file(src_path),
+            template_hash,
+            basepath,
+            os.path.relpath(dest_path, dest_dir_path),
+            page_assets_hash,
+            page_images_hash,
+            minify,
+        )
+        if not is_page_current(previous_pages.get(src_path), entry, dest_dir_path) or (
+            search_index is not None and src_path not in search_index.pages
+        ):
+            stale_pages.append((src_path, dest_path))
+        current_pages[src_path] = entry
+
+    try:
+        generate_pages(
+            stale_pages,
+            template_path,
+            basepath,
+            jobs=jobs,
+            profiler=profiler,
+            cache=cache,
+            assets=assets,
+            images=images,
+            minify=minify,
+            search_index=search_index,
+        )
+        if search_index is not None:
+            for src_path in list(search_index.pages):
+                if src_path not in current_pages:
+                    search_index.remove_page(src_path)
+            search_index.finish()
+    finally:
+        if search_index is not None:
+            search_index.close()
+    generated = [dest_path for _, dest_path in stale_pages]
+
+    current_outputs = {entry["output"] for entry in current_pages.values()}
+    for src_path, entry in previous_pages.items():
+        if src_path in current_pages or entry["output"] in current_outputs:
+            continue
+        output_path = os.path.join(dest_dir_path, entry["output"])
+        remove_stale_output(output_path, dest_dir_path)
+
+    skipped = len(current_pages) - len(generated)
+    if skipped:
+        print(f"Skipped {skipped} unchanged page(s)")
+
+    manifest["pages"] = current_pages
+    save_manifest(dest_dir_path, manifest)
+    return generated
+
+
+def remove_stale_output(output_path, dest_dir_path):
+    if not os.path.exists(output_path):
+        return
+    print(f"Removing stale page {output_path}")
+    os.remove(output_path)
+    remove_empty_parents(output_path, dest_dir_path)
@@ -1,4 +1,9 @@
+URL_ATTRIBUTES = ("href", "src")
+
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str = None,
@@ -11,14 +16,24 @@ class HTMLNode:
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, basepath="/", assets=None):
         raise NotImplementedError
 
-    def props_to_html(self):
+    def write_html(self, out, basepath="/", assets=None):
+        self.emit_html(writer_for(out), basepath, assets)
+
+    def emit_html(self, write, basepath="/", assets=None):
+        write(self.to_html(basepath, assets))
+
+    def props_to_html(self, basepath="/", assets=None):
         if not self.props:
             return ""
 
-        html_attributes = [f'{key}="{value}"' for key, value in self.props.items()]
+        html_attributes = []
+        for key, value in self.props.items():
+            if key in URL_ATTRIBUTES:
+                value = resolve_url(value, basepath, assets)
+            html_attributes.append(f'{key}="{value}"')
         return " " + " ".join(html_attributes)
 
     def __repr__(self):
@@ -26,16 +41,18 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, value: str, props: dict = None):
         super().__init__(tag, value, props=props)
 
-    def to_html(self):
+    def to_html(self, basepath="/", assets=None):
         if self.value is None:
             raise ValueError("invalid HTML: no value")
         if self.tag is None:
             return self.value
 
-        opening_tag = "<" + self.tag + self.props_to_html() + ">"
+        opening_tag = "<" + self.tag + self.props_to_html(basepath, assets) + ">"
         closing_tag = f"</{self.tag}>"
         return opening_tag + self.value + closing_tag
 
@@ -44,20 +61,43 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: list, props=None):
         super().__init__(tag, children=children, props=props)
 
-    def to_html(self):
+    def to_html(self, basepath="/", assets=None):
+        chunks = []
+        self.emit_html(chunks.append, basepath, assets)
+        return "".join(chunks)
+
+    def emit_html(self, write, basepath="/", assets=None):
         if self.tag is None:
             raise ValueError("invalid HTML: no tag")
         if not self.children:
             raise ValueError("No child nodes provided")
 
-        opening_tag = f"<{self.tag}{self.props_to_html()}>"
-        closing_tag = f"</{self.tag}>"
-        children_html = "".join(child.to_html() for child in self.children)
-
-        return opening_tag + children_html + closing_tag
+        write(f"<{self.tag}{self.props_to_html(basepath, assets)}>")
+        for child in self.children:
+            child.emit_html(write, basepath, assets)
+        write(f"</{self.tag}>")
 
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
+
+
+def resolve_url(url, basepath, assets=None):
+    # Only site-root paths move under the basepath; "//host" keeps its scheme.
+    if not url.startswith("/") or url.startswith("//"):
+        return url
+    if assets:
+        url = assets.get(url, url)
+    if basepath == "/":
+        return url
+    return basepath + url[1:]
+
+
+def writer_for(out):
+    if isinstance(out, list):
+        return out.append
+    return out.write
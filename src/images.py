@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import struct
+import zlib
+
+from fingerprint import url_path
+from manifest import hash_bytes
+
+DEFAULT_IMAGE_CACHE_DIR = os.path.join(".cache", "images")
+IMAGE_EXTENSIONS = (".png", ".gif", ".jpg", ".jpeg")
+PNG_PIPELINE = "png-2"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Text and timestamps only, which no browser reads when showing the image.
+# Everything else is kept, as chunks like eXIf and cICP change the orientation
+# or colours the image is displayed with.
+PNG_METADATA_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+# Start-of-frame markers carry the dimensions; C4, C8 and CC reuse the range.
+JPEG_FRAME_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_STANDALONE_MARKERS = set(range(0xD0, 0xDA)) | {0x01}
+
+
+class ImageOptimizer:
+    def __init__(self, cache_dir=DEFAULT_IMAGE_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def pipeline_for(self, path):
+        if path.lower().endswith(".png"):
+            return PNG_PIPELINE
+        return None
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".png")
+
+    def optimize(self, src_path, dest_path):
+        with open(src_path, "rb") as f:
+            data = f.read()
+
+        # Recompressing is slow, so results are kept by source hash.
+        cache_path = self.path_for(hash_bytes(f"{PNG_PIPELINE}\0".encode() + data))
+        if os.path.exists(cache_path):
+            shutil.copyfile(cache_path, dest_path)
+        else:
+            optimized = optimize_png(data)
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(optimized)
+            os.replace(tmp_path, cache_path)
+            with open(dest_path, "wb") as f:
+                f.write(optimized)
+        shutil.copystat(src_path, dest_path)
+
+
+def optimize_png(data):
+    chunks = read_png_chunks(data)
+    if chunks is None:
+        return data
+
+    kept = []
+    image_data = []
+    for chunk_type, body in chunks:
+        if chunk_type == b"IDAT":
+            # The recompressed data goes where the first IDAT chunk was.
+            if not image_data:
+                kept.append((chunk_type, None))
+            image_data.append(body)
+        elif chunk_type == b"acTL":
+            # Animation frames live outside IDAT, leave those files alone.
+            return data
+        elif chunk_type not in PNG_METADATA_CHUNKS:
+            kept.append((chunk_type, body))
+
+    try:
+        pixels = zlib.decompress(b"".join(image_data))
+    except zlib.error:
+        return data
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9)
+    compressed = compressor.compress(pixels) + compressor.flush()
+
+    parts = [PNG_SIGNATURE]
+    for chunk_type, body in kept:
+        if chunk_type == b"IDAT":
+            body = compressed
+        parts.append(png_chunk(chunk_type, body))
+    optimized = b"".join(parts)
+    return optimized if len(optimized) < len(data) else data
+
+
+def read_png_chunks(data):
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    chunks = []
+    position = len(PNG_SIGNATURE)
+    while position + 12 <= len(data):
+        (length,) = struct.unpack(">I", data[position : position + 4])
+        chunk_type = data[position + 4 : position + 8]
+        body = data[position + 8 : position + 8 + length]
+        if len(body) != length:
+            return None
+        chunks.append((chunk_type, body))
+        position += 12 + length
+        if chunk_type == b"IEND":
+            return chunks
+    return None
+
+
+def png_chunk(chunk_type, body):
+    crc = zlib.crc32(chunk_type + body)
+    return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", crc)
+
+
+def image_size(path):
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            f.seek(2)
+            return jpeg_size(f)
+    return None
+
+
+def jpeg_size(f):
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        if marker[0] in JPEG_STANDALONE_MARKERS:
+            continue
+
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        (length,) = struct.unpack(">H", header)
+        if marker[0] in JPEG_FRAME_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_sizes(dest, manifest):
+    sizes = {}
+    for rel_path in sorted(manifest["assets"]):
+        if not rel_path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        size = image_size(os.path.join(dest, rel_path))
+        if size is not None:
+            sizes[url_path(rel_path)] = list(size)
+    return sizes
+
+
+def images_hash(sizes, urls=None):
+    if sizes is None:
+        return None
+    if urls is not None:
+        sizes = {url: sizes[url] for url in urls if url in sizes}
+    return hash_bytes(json.dumps(sizes, sort_keys=True).encode())
+
+
+def add_image_attributes(root, sizes, eager_images=1):
+    images = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.tag == "img":
+            images.append(node)
+        if node.children:
+            stack.extend(reversed(node.children))
+
+    for index, node in enumerate(images):
+        size = sizes.get(node.props.get("src"))
+        if size is not None:
+            node.props["width"] = str(size[0])
+            node.props["height"] = str(size[1])
+        # The first image is usually above the fold, where lazy loading
+        # would only delay the largest paint.
+        if index >= eager_images:
+            node.props["loading"] = "lazy"
+        node.props["decoding"] = "async"
+    return max(eager_images - len(images), 0)
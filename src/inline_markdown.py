@@ -1,9 +1,151 @@
 import re
 
+from htmlnode import resolve_url
 from textnode import TextNode, TextType
 
+INLINE_DELIMITERS = {
+    "`": TextType.CODE,
+    "_": TextType.ITALIC,
+    "**": TextType.BOLD,
+}
+
+# Delimiters that take precedence over the key, so a span opened by the key
+# may not cross them. Mirrors the order of the passes in the multipass parser.
+OUTER_DELIMITERS = {
+    "`": (),
+    "_": ("`",),
+    "**": ("`", "_"),
+}
+
+# The same spans as markup, for rendering without building nodes first.
+INLINE_TAGS = {
+    "`": ("<code>", "</code>"),
+    "_": ("<i>", "</i>"),
+    "**": ("<b>", "</b>"),
+}
+
+DELIMITER_PATTERN = re.compile(r"`|_|\*\*")
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_OR_IMAGE_PATTERN = re.compile(r"(!?)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
 
 def text_to_text_nodes(text):
+    nodes = []
+    position = 0
+
+    while True:
+        match = DELIMITER_PATTERN.search(text, position)
+        if match is None:
+            append_text_run(nodes, text[position:])
+            return nodes
+
+        append_text_run(nodes, text[position : match.start()])
+
+        delimiter = match.group()
+        content_start = match.end()
+        content_end = text.find(delimiter, content_start)
+        if content_end == -1:
+            raise ValueError("invalid markdown, formatted section not closed")
+        for outer in OUTER_DELIMITERS[delimiter]:
+            if text.find(outer, content_start, content_end) != -1:
+                raise ValueError("invalid markdown, formatted section not closed")
+
+        if content_end > content_start:
+            nodes.append(
+                TextNode(text[content_start:content_end], INLINE_DELIMITERS[delimiter])
+            )
+        position = content_end + len(delimiter)
+
+
+def append_text_run(nodes, text):
+    position = 0
+    for match in LINK_OR_IMAGE_PATTERN.finditer(text):
+        if match.start() > position:
+            nodes.append(TextNode(text[position : match.start()], TextType.TEXT))
+
+        text_type = TextType.IMAGE if match.group(1) else TextType.LINK
+        nodes.append(TextNode(match.group(2), text_type, match.group(3)))
+        position = match.end()
+
+    if position < len(text):
+        nodes.append(TextNode(text[position:], TextType.TEXT))
+
+
+def text_to_html(text, basepath="/", assets=None):
+    # Mirrors text_to_text_nodes, but writes each piece as the HTML its
+    # LeafNode would render to.
+    parts = []
+    position = 0
+
+    while True:
+        match = DELIMITER_PATTERN.search(text, position)
+        if match is None:
+            append_text_run_html(parts, text[position:], basepath, assets)
+            return "".join(parts)
+
+        append_text_run_html(parts, text[position : match.start()], basepath, assets)
+
+        delimiter = match.group()
+        content_start = match.end()
+        content_end = text.find(delimiter, content_start)
+        if content_end == -1:
+            raise ValueError("invalid markdown, formatted section not closed")
+        for outer in OUTER_DELIMITERS[delimiter]:
+            if text.find(outer, content_start, content_end) != -1:
+                raise ValueError("invalid markdown, formatted section not closed")
+
+        if content_end > content_start:
+            opening, closing = INLINE_TAGS[delimiter]
+            parts.append(opening + text[content_start:content_end] + closing)
+        position = content_end + len(delimiter)
+
+
+def append_text_run_html(parts, text, basepath="/", assets=None):
+    if "](" not in text:
+        if text:
+            parts.append(text)
+        return
+
+    position = 0
+    for match in LINK_OR_IMAGE_PATTERN.finditer(text):
+        if match.start() > position:
+            parts.append(text[position : match.start()])
+
+        url = resolve_url(match.group(3), basepath, assets)
+        if match.group(1):
+            parts.append(f'<img src="{url}" alt="{match.group(2)}"></img>')
+        else:
+            parts.append(f'<a href="{url}">{match.group(2)}</a>')
+        position = match.end()
+
+    if position < len(text):
+        parts.append(text[position:])
+
+
+def text_links(text):
+    # The links and images text_to_html would render, as (offset, is_image,
+    # url) tuples. Formatted spans are skipped, as their content stays text.
+    links = []
+    position = 0
+
+    while True:
+        match = DELIMITER_PATTERN.search(text, position)
+        end = len(text) if match is None else match.start()
+        if "](" in text[position:end]:
+            for link in LINK_OR_IMAGE_PATTERN.finditer(text, position, end):
+                links.append((link.start(), bool(link.group(1)), link.group(3)))
+        if match is None:
+            return links
+
+        delimiter = match.group()
+        content_end = text.find(delimiter, match.end())
+        if content_end == -1:
+            raise ValueError("invalid markdown, formatted section not closed")
+        position = content_end + len(delimiter)
+
+
+def text_to_text_nodes_multipass(text):
     delimiters = (("`", TextType.CODE), ("_", TextType.ITALIC), ("**", TextType.BOLD))
 
     starting_node = TextNode(text, TextType.TEXT)
@@ -54,9 +196,9 @@ def split_nodes_link(old_nodes):
 def split_nodes_helper(old_nodes, text_type: TextType):
     match text_type:
         case TextType.IMAGE:
-            extract_func = extract_markdown_images
+            pattern = IMAGE_PATTERN
         case TextType.LINK:
-            extract_func = extract_markdown_links
+            pattern = LINK_PATTERN
         case _:
             raise Exception("invalid node type")
 
@@ -67,46 +209,36 @@ def split_nodes_helper(old_nodes, text_type: TextType):
             new_nodes.append(old_node)
             continue
 
-        matches = extract_func(old_node.text)
-        if not matches:
-            new_nodes.append(old_node)
-            continue
-
+        # Slice around the match spans instead of re-searching the remaining
+        # text for each match, which keeps this linear in the number of links.
         split_nodes = []
         node_string = old_node.text
+        position = 0
 
-        for text, url in matches:
-            match text_type:
-                case TextType.IMAGE:
-                    split_pattern = f"![{text}]({url})"
-                case TextType.LINK:
-                    split_pattern = f"[{text}]({url})"
-                case _:
-                    raise Exception("invalid node type")
-
-            sections = node_string.split(split_pattern, 1)
-            if len(sections) != 2:
-                raise ValueError("invalid markdown, image section not closed")
-
-            if sections[0]:
-                text_node = TextNode(sections[0], TextType.TEXT)
-                split_nodes.append(text_node)
+        for match in pattern.finditer(node_string):
+            if match.start() > position:
+                text = node_string[position : match.start()]
+                split_nodes.append(TextNode(text, TextType.TEXT))
 
-            node = TextNode(text, text_type, url)
+            node = TextNode(match.group(1), text_type, match.group(2))
             split_nodes.append(node)
 
-            node_string = sections[1]
+            position = match.end()
+
+        if not split_nodes:
+            new_nodes.append(old_node)
+            continue
 
-        if node_string:
-            split_nodes.append(TextNode(node_string, TextType.TEXT))
+        if position < len(node_string):
+            split_nodes.append(TextNode(node_string[position:], TextType.TEXT))
 
         new_nodes.extend(split_nodes)
     return new_nodes
 
 
 def extract_markdown_images(text):
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return LINK_PATTERN.findall(text)
@@ -0,0 +1,133 @@
+import bisect
+import collections
+import urllib.parse
+
+from block_markdown import BlockType, block_inline_texts, iter_blocks, iter_lines
+from fingerprint import ASSET_MANIFEST_FILENAME, url_path
+from htmlnode import resolve_url
+from inline_markdown import text_links
+from template import URL_ATTRIBUTE_PATTERN
+
+
+class BrokenLink:
+    __slots__ = ("source", "line", "url", "is_image")
+
+    def __init__(self, source, line, url, is_image=False):
+        self.source = source
+        self.line = line
+        self.url = url
+        self.is_image = is_image
+
+    def __eq__(self, other):
+        return (
+            self.source == other.source
+            and self.line == other.line
+            and self.url == other.url
+            and self.is_image == other.is_image
+        )
+
+    def __repr__(self):
+        return f"BrokenLink({self.source}:{self.line}, {self.url}, {self.is_image})"
+
+
+def build_link_index(manifest, basepath="/"):
+    # Every URL the output answers, as the rendered pages spell it: the
+    # basepath prefix included, and pages under their directory URLs too.
+    rel_paths = [ASSET_MANIFEST_FILENAME]
+    rel_paths.extend(manifest["assets"])
+    rel_paths.extend(entry["path"] for entry in manifest["fingerprints"].values())
+    rel_paths.extend(entry["output"] for entry in manifest["pages"].values())
+
+    index = set()
+    for rel_path in rel_paths:
+        url = basepath + url_path(rel_path)[1:]
+        index.add(url)
+        if url.endswith("/index.html"):
+            index.add(url[: -len("index.html")])
+            index.add(url[: -len("/index.html")])
+    return index
+
+
+def check_links(manifest, basepath="/", assets=None, template_path=None):
+    index = build_link_index(manifest, basepath)
+    broken = []
+
+    if template_path is not None:
+        with open(template_path, "r") as f:
+            for number, line in enumerate(f, 1):
+                for match in URL_ATTRIBUTE_PATTERN.finditer(line):
+                    if not is_internal(match.group(2)):
+                        continue
+                    url = resolve_url(match.group(2), basepath, assets)
+                    if not is_indexed(url, index):
+                        link = BrokenLink(template_path, number, match.group(2))
+                        broken.append(link)
+
+    for src_path in sorted(manifest["pages"]):
+        with open(src_path, "r") as f:
+            for number, is_image, url in iter_page_links(iter_lines(f)):
+                if not is_internal(url):
+                    continue
+                if not is_indexed(resolve_url(url, basepath, assets), index):
+                    broken.append(BrokenLink(src_path, number, url, is_image))
+    return broken
+
+
+def iter_page_links(lines):
+    # Yields (line number, is_image, url) for every link the page renders,
+    # walking the same blocks as the renderer so code is never checked. Only
+    # the lines not yet matched to a block are held, so a file can be passed
+    # in a line at a time.
+    pending = collections.deque()
+
+    def read(lines):
+        for line in lines:
+            pending.append(line)
+            yield line
+
+    number = 0
+    for block_type, block_lines in iter_blocks(read(lines)):
+        # Blocks are runs of consecutive lines with only blank lines between.
+        while not pending[0] or pending[0].isspace():
+            pending.popleft()
+            number += 1
+        first_line = number + 1
+        for _ in block_lines:
+            pending.popleft()
+        number += len(block_lines)
+
+        if block_type == BlockType.CODE:
+            continue
+        texts = block_inline_texts(block_type, block_lines)
+        if block_type in (BlockType.PARAGRAPH, BlockType.QUOTE):
+            yield from joined_links(texts, first_line)
+            continue
+        for offset, text in enumerate(texts):
+            for _, is_image, url in text_links(text):
+                yield first_line + offset, is_image, url
+
+
+def joined_links(pieces, first_line):
+    # The renderer joins these lines with spaces, so each link's offset in the
+    # joined text is mapped back to the line it starts on.
+    starts = []
+    position = 0
+    for piece in pieces:
+        starts.append(position)
+        position += len(piece) + 1
+    for position, is_image, url in text_links(" ".join(pieces)):
+        yield first_line + bisect.bisect_right(starts, position) - 1, is_image, url
+
+
+def is_internal(url):
+    return url.startswith("/") and not url.startswith("//")
+
+
+def is_indexed(url, index):
+    path = urllib.parse.urlsplit(url).path
+    return path in index or urllib.parse.unquote(path) in index
+
+
+def format_broken_link(link):
+    kind = "image" if link.is_image else "link"
+    return f"{link.source}:{link.line}: broken {kind} {link.url}"
@@ -1,7 +1,26 @@
-import sys
+import argparse
+import os
+import shutil
 
-from copy_static import copy_directory_recursive
-from generation import generate_pages_recursive
+from compress import compress_outputs, remove_sidecars
+from copy_static import sync_directory
+from fingerprint import fingerprint_assets, remove_fingerprints
+from fragment_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, FragmentCache
+from generation import generate_pages_incremental
+from images import ImageOptimizer, image_sizes
+from links import check_links, format_broken_link
+from manifest import load_manifest
+from minify import CssMinifier
+from profiling import BuildProfiler
+from publish import (
+    discard_staging,
+    output_changes,
+    publish_output,
+    snapshot_output,
+    stage_output,
+    write_changes,
+)
+from watch import SiteWatcher, watch
 
 # Paths
 dir_path_static = "static"
@@ -10,27 +29,238 @@ dir_path_content = "content"
 template_path = "template.html"
 
 
-def main():
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-        if not basepath.startswith("/"):
-            basepath = "/" + basepath
-        if not basepath.endswith("/"):
-            basepath += "/"
+def normalize_basepath(basepath):
+    if not basepath.startswith("/"):
+        basepath = "/" + basepath
+    if not basepath.endswith("/"):
+        basepath += "/"
 
     if basepath == "//":
         basepath = "/"
+    return basepath
 
-    print("Starting static site generation with basepath: '{basepath}'")
-    copy_directory_recursive(dir_path_static, dir_path_output)
 
-    print(
-        f"Generating pages from '{dir_path_content}' to '{dir_path_output}' using '{template_path}' template..."
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="wipe the output directory and rebuild every page",
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="write straight into the output directory instead of staging a copy and swapping it in",
+    )
+    parser.add_argument(
+        "--hash-assets",
+        action="store_true",
+        help="compare static files by content hash when their mtime changed",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="serve static files under content-hashed names and rewrite references",
+    )
+    parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="recompress PNGs and add size and loading hints to img tags",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip insignificant whitespace from the template and CSS",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write precompressed .gz (and .zst when available) sidecar files",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded client-side search index alongside the pages",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report internal links and images that point at no page or static file",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="render pages across N worker processes (0 uses every core)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="serve the output directory and rebuild on changes",
+    )
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--changes-output",
+        help="write the output paths this build changed or removed to a JSON file",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="record per-page stage timings and write a JSON build report",
+    )
+    parser.add_argument("--profile-output", default="build-profile.json")
+    parser.add_argument("--profile-top", type=int, default=10)
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="where rendered content fragments are cached between builds",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="evict least recently used fragments beyond this many MiB",
     )
-    generate_pages_recursive(dir_path_content, template_path, dir_path_output, basepath)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always parse markdown instead of reusing cached fragments",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    basepath = normalize_basepath(args.basepath)
+    jobs = args.jobs or os.cpu_count() or 1
+
+    print(f"Starting static site generation with basepath: '{basepath}'")
+    optimizers = []
+    if args.optimize_images:
+        optimizers.append(ImageOptimizer())
+    if args.minify:
+        optimizers.append(CssMinifier())
+    profiler = BuildProfiler() if args.profile else None
+    cache = None
+    if not args.no_cache:
+        cache = FragmentCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    before = snapshot_output(dir_path_output)
+    if args.in_place:
+        if args.clean and os.path.exists(dir_path_output):
+            shutil.rmtree(dir_path_output)
+        build_site(
+            args,
+            dir_path_output,
+            basepath,
+            jobs=jobs,
+            optimizers=optimizers,
+            profiler=profiler,
+            cache=cache,
+        )
+        after = snapshot_output(dir_path_output)
+    else:
+        # The served directory keeps the previous build until the new one is
+        # complete, then the finished tree is swapped in with a rename.
+        staging_dir = stage_output(dir_path_output, reuse=not args.clean)
+        try:
+            build_site(
+                args,
+                staging_dir,
+                basepath,
+                jobs=jobs,
+                optimizers=optimizers,
+                profiler=profiler,
+                cache=cache,
+            )
+            after = snapshot_output(staging_dir)
+            publish_output(staging_dir, dir_path_output)
+        except BaseException:
+            discard_staging(staging_dir)
+            raise
+        print(f"Published '{dir_path_output}'")
+
+    changed, removed = output_changes(before, after)
+    print(f"Output files: {len(changed)} changed, {len(removed)} removed")
+    if args.changes_output:
+        write_changes(args.changes_output, changed, removed)
+        print(f"Wrote changed output paths to '{args.changes_output}'")
+
+    if cache is not None:
+        evicted = cache.prune()
+        if evicted:
+            print(f"Evicted {evicted} cached fragment(s)")
+    if profiler is not None:
+        profiler.write_report(args.profile_output)
+        profiler.print_summary(args.profile_top)
+        print(f"Wrote build profile to '{args.profile_output}'")
     print("Done!")
 
+    if args.watch:
+        watcher = SiteWatcher(
+            dir_path_content,
+            dir_path_static,
+            template_path,
+            dir_path_output,
+            basepath,
+            cache=cache,
+            fingerprint=args.fingerprint,
+            optimizers=optimizers,
+            compress=args.compress,
+            image_hints=args.optimize_images,
+            minify=args.minify,
+            search=args.search,
+        )
+        watch(watcher, args.port)
+
+
+def build_site(args, output_dir, basepath, *, jobs, optimizers, profiler, cache):
+    sync_directory(
+        dir_path_static,
+        output_dir,
+        use_hash=args.hash_assets,
+        optimizers=optimizers,
+    )
+    images = None
+    if args.optimize_images:
+        images = image_sizes(output_dir, load_manifest(output_dir))
+    assets = None
+    if args.fingerprint:
+        assets = fingerprint_assets(output_dir)
+        print(f"Fingerprinted {len(assets)} static file(s)")
+    else:
+        remove_fingerprints(output_dir)
+
+    print(
+        f"Generating pages from '{dir_path_content}' to '{output_dir}' using '{template_path}' template..."
+    )
+    generate_pages_incremental(
+        dir_path_content,
+        template_path,
+        output_dir,
+        basepath,
+        jobs=jobs,
+        profiler=profiler,
+        cache=cache,
+        assets=assets,
+        images=images,
+        minify=args.minify,
+        search=args.search,
+    )
+    if args.check_links:
+        manifest = load_manifest(output_dir)
+        broken = check_links(manifest, basepath, assets, template_path)
+        for link in broken:
+            print(format_broken_link(link))
+        print(f"Checked links: {len(broken)} broken")
+    if args.compress:
+        sidecars = compress_outputs(output_dir, jobs)
+        print(f"Compressed {len(sidecars)} sidecar file(s)")
+    else:
+        remove_sidecars(output_dir)
+
 
 if __name__ == "__main__":
     main()
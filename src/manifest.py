@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+
+from block_markdown import PARSER_VERSION
+
+MANIFEST_FILENAME = ".build-manifest.json"
+MANIFEST_VERSION = 2
+
+
+def hash_bytes(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        # Chunked, so hashing a very large page doesn't load it whole.
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def empty_manifest():
+    return {
+        "version": MANIFEST_VERSION,
+        "pages": {},
+        "assets": {},
+        "fingerprints": {},
+        "sidecars": {},
+        "search": {},
+    }
+
+
+def load_manifest(dest_dir):
+    path = os.path.join(dest_dir, MANIFEST_FILENAME)
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return empty_manifest()
+
+    # A manifest from a different format version can't be trusted, rebuild.
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    manifest.setdefault("pages", {})
+    manifest.setdefault("assets", {})
+    manifest.setdefault("fingerprints", {})
+    manifest.setdefault("sidecars", {})
+    manifest.setdefault("search", {})
+    return manifest
+
+
+def save_manifest(dest_dir, manifest):
+    os.makedirs(dest_dir, exist_ok=True)
+    path = os.path.join(dest_dir, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def page_entry(
+    source_hash,
+    template_hash,
+    basepath,
+    output,
+    assets_hash=None,
+    images_hash=None,
+    minify=False,
+):
+    return {
+        "source_hash": source_hash,
+        "template_hash": template_hash,
+        "basepath": basepath,
+        "assets_hash": assets_hash,
+        "images_hash": images_hash,
+        "minify": minify,
+        # The renderer's version, so a change to its output rebuilds every page.
+        "parser_version": PARSER_VERSION,
+        "output": output,
+    }
+
+
+def is_page_current(previous_entry, entry, dest_dir):
+    # Outputs are relative, so the manifest survives the staged build's swap.
+    return previous_entry == entry and os.path.exists(
+        os.path.join(dest_dir, entry["output"])
+    )
+
+
+def asset_entry(stat, content_hash=None):
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if content_hash is not None:
+        entry["hash"] = content_hash
+    return entry
@@ -0,0 +1,78 @@
+import re
+import shutil
+
+CSS_PIPELINE = "css-min-1"
+
+# Whitespace inside these elements is part of their content.
+PRESERVED_ELEMENT_PATTERN = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.DOTALL | re.IGNORECASE
+)
+HTML_COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
+# Only ASCII whitespace collapses, a literal no-break space must survive.
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+
+# Space next to these tags never renders, unlike space between inline tags.
+BLOCK_TAG_PATTERN = re.compile(
+    r" ?(</?(?:!doctype|html|head|body|meta|link|title|base|article|section"
+    r"|header|footer|nav|main|aside|div|p|ul|ol|li|h[1-6]|blockquote|pre"
+    r"|table|thead|tbody|tr|th|td|script|style|hr|br)\b[^>]*>) ?",
+    re.IGNORECASE,
+)
+
+CSS_STRING_PATTERN = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+CSS_STRING_OR_COMMENT_PATTERN = re.compile(
+    CSS_STRING_PATTERN.pattern + r"|/\*.*?\*/", re.DOTALL
+)
+# A space before ":" can be a descendant combinator, so only trim after it.
+CSS_PUNCTUATION_PATTERN = re.compile(r" ?([{};,>]) ?")
+CSS_COLON_PATTERN = re.compile(r": ")
+
+
+class CssMinifier:
+    def pipeline_for(self, path):
+        if path.lower().endswith(".css"):
+            return CSS_PIPELINE
+        return None
+
+    def optimize(self, src_path, dest_path):
+        with open(src_path, "r") as f:
+            css = f.read()
+        with open(dest_path, "w") as f:
+            f.write(minify_css(css))
+        shutil.copystat(src_path, dest_path)
+
+
+def minify_html(html):
+    parts = PRESERVED_ELEMENT_PATTERN.split(html)
+    minified = []
+    # split() interleaves text, the whole preserved element and its tag name.
+    for index in range(0, len(parts), 3):
+        text = HTML_COMMENT_PATTERN.sub("", parts[index])
+        text = WHITESPACE_PATTERN.sub(" ", text)
+        text = BLOCK_TAG_PATTERN.sub(r"\1", text)
+        # Only a textarea sits inline, the other preserved tags are blocks.
+        if index > 0 and parts[index - 1].lower() != "textarea":
+            text = text.lstrip(" ")
+        if index + 1 < len(parts) and parts[index + 2].lower() != "textarea":
+            text = text.rstrip(" ")
+        minified.append(text)
+        if index + 1 < len(parts):
+            minified.append(parts[index + 1])
+    return "".join(minified).strip()
+
+
+def minify_css(css):
+    # Comments go first, skipping any "/*" that sits inside a string.
+    css = CSS_STRING_OR_COMMENT_PATTERN.sub(lambda match: match.group(1) or " ", css)
+    parts = CSS_STRING_PATTERN.split(css)
+    minified = []
+    # Odd parts are string literals, which are kept as written.
+    for index, part in enumerate(parts):
+        if index % 2:
+            minified.append(part)
+            continue
+        part = WHITESPACE_PATTERN.sub(" ", part)
+        part = CSS_PUNCTUATION_PATTERN.sub(r"\1", part)
+        part = CSS_COLON_PATTERN.sub(":", part)
+        minified.append(part.replace(";}", "}"))
+    return "".join(minified).strip()
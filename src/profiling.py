@@ -0,0 +1,197 @@
+import contextlib
+import json
+import os
+import sys
+import time
+
+import block_markdown
+import fragment_cache
+import generation
+
+# Each page only passes through the stages of the path generate_page takes
+# for it: "render" for the fused markdown-to-HTML pass, "node_construction"
+# when image hints need a node tree, "cache" around the fragment cache (with
+# "render" inside it on a miss), and "stream" for pages rendered and
+# written one block at a time.
+STAGES = (
+    "read",
+    "parse_blocks",
+    "inline_parse",
+    "node_construction",
+    "render",
+    "cache",
+    "stream",
+    "write",
+)
+
+
+class PageStages:
+    # A stage entered while another is running is taken out of the outer
+    # stage's figures, so every stage reports its own time.
+    def __init__(self):
+        self.stages = {}
+        self.outer = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.outer.append([0.0, 0])
+        blocks_before = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            net_blocks = sys.getallocatedblocks() - blocks_before
+            inner_seconds, inner_blocks = self.outer.pop()
+            if self.outer:
+                self.outer[-1][0] += seconds
+                self.outer[-1][1] += net_blocks
+            totals = self.stages.setdefault(name, {"seconds": 0.0, "net_blocks": 0})
+            totals["seconds"] += seconds - inner_seconds
+            totals["net_blocks"] += net_blocks - inner_blocks
+
+    def timed(self, name):
+        def wrap(func):
+            def timed_func(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+
+            return timed_func
+
+        return wrap
+
+    def timed_iter(self, name):
+        # A generator does its work between yields, so time every step.
+        def wrap(func):
+            def timed_func(*args, **kwargs):
+                items = iter(func(*args, **kwargs))
+                while True:
+                    with self.stage(name):
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            return
+                    yield item
+
+            return timed_func
+
+        return wrap
+
+    def path(self):
+        if "stream" in self.stages:
+            return "stream"
+        if "cache" in self.stages:
+            return "cache_miss" if "render" in self.stages else "cache_hit"
+        if "node_construction" in self.stages:
+            return "nodes"
+        return "render"
+
+
+class BuildProfiler:
+    def __init__(self):
+        self.pages = []
+
+    def profile_page(
+        self,
+        from_path,
+        template,
+        dest_path,
+        basepath="/",
+        *,
+        cache=None,
+        images=None,
+        search=False,
+    ):
+        # The page goes through generate_page itself, so it takes the same
+        # branch a real build would. The block and inline passes are timed
+        # from inside whichever renderer that branch calls.
+        page = PageStages()
+        instrumented = (
+            (block_markdown, "iter_blocks", page.timed_iter("parse_blocks")),
+            (generation, "iter_blocks", page.timed_iter("parse_blocks")),
+            (block_markdown, "extract_title", page.timed("parse_blocks")),
+            (block_markdown, "text_to_html", page.timed("inline_parse")),
+            (block_markdown, "text_to_text_nodes", page.timed("inline_parse")),
+            (fragment_cache, "render_fragment", page.timed("render")),
+        )
+        with contextlib.ExitStack() as patches:
+            for module, name, wrap in instrumented:
+                patches.enter_context(patched(module, name, wrap))
+            title, terms = generation.generate_page(
+                from_path,
+                None,
+                dest_path,
+                basepath,
+                log=lambda message: None,
+                template=template,
+                cache=cache,
+                images=images,
+                search=search,
+                stage=page.stage,
+            )
+
+        self.pages.append(
+            {
+                "source": from_path,
+                "output": dest_path,
+                "bytes": os.path.getsize(from_path),
+                "path": page.path(),
+                "seconds": sum(stage["seconds"] for stage in page.stages.values()),
+                "stages": {
+                    name: page.stages[name] for name in STAGES if name in page.stages
+                },
+            }
+        )
+        return title, terms
+
+    def report(self):
+        totals = {name: {"seconds": 0.0, "net_blocks": 0} for name in STAGES}
+        for page in self.pages:
+            for name, stage in page["stages"].items():
+                totals[name]["seconds"] += stage["seconds"]
+                totals[name]["net_blocks"] += stage["net_blocks"]
+        paths = {}
+        for page in self.pages:
+            paths[page["path"]] = paths.get(page["path"], 0) + 1
+        return {
+            "page_count": len(self.pages),
+            "paths": paths,
+            "seconds": sum(page["seconds"] for page in self.pages),
+            "stages": totals,
+            "pages": self.pages,
+        }
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def slowest_pages(self, count=10):
+        ranked = sorted(self.pages, key=lambda page: page["seconds"], reverse=True)
+        return ranked[:count]
+
+    def print_summary(self, count=10):
+        report = self.report()
+        print(f"Profiled {report['page_count']} page(s) in {report['seconds']:.3f}s")
+        for path, pages in report["paths"].items():
+            print(f"  {pages} page(s) through {path}")
+        for name, stage in report["stages"].items():
+            print(f"  {name:<18} {stage['seconds'] * 1000:>10.2f} ms")
+        print(f"Slowest {count} page(s):")
+        for page in self.slowest_pages(count):
+            slowest_stage = max(
+                page["stages"], key=lambda name: page["stages"][name]["seconds"]
+            )
+            print(
+                f"  {page['seconds'] * 1000:>10.2f} ms  {page['source']}"
+                f" ({page['path']}, mostly {slowest_stage})"
+            )
+
+
+@contextlib.contextmanager
+def patched(module, name, wrap):
+    original = getattr(module, name)
+    setattr(module, name, wrap(original))
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
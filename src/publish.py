@@ -0,0 +1,105 @@
+import ctypes
+import errno
+import json
+import os
+import shutil
+
+from copy_static import walk_files
+from fingerprint import link_or_copy
+from manifest import MANIFEST_FILENAME
+
+STAGING_SUFFIX = ".staging"
+RETIRED_SUFFIX = ".old"
+
+# renameat2(2) flags, see <linux/fs.h>.
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def staging_path(output_dir):
+    return os.path.normpath(output_dir) + STAGING_SUFFIX
+
+
+def stage_output(output_dir, reuse=True):
+    staging_dir = staging_path(output_dir)
+    # Whatever a crashed build left behind is half-written, start over.
+    discard_staging(staging_dir)
+    if reuse and os.path.isdir(output_dir):
+        link_tree(output_dir, staging_dir)
+    else:
+        os.makedirs(staging_dir)
+    return staging_dir
+
+
+def link_tree(src, dest):
+    os.makedirs(dest)
+    for rel_path in walk_files(src):
+        dest_path = os.path.join(dest, rel_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        link_or_copy(os.path.join(src, rel_path), dest_path)
+
+
+def publish_output(staging_dir, output_dir):
+    if not os.path.exists(output_dir):
+        os.rename(staging_dir, output_dir)
+        return
+    if exchange_paths(staging_dir, output_dir):
+        # The staging path now holds the previous output.
+        shutil.rmtree(staging_dir)
+        return
+
+    # Without an atomic exchange the output is missing between two renames,
+    # which is still far shorter than a whole build.
+    retired_dir = os.path.normpath(output_dir) + RETIRED_SUFFIX
+    discard_staging(retired_dir)
+    os.rename(output_dir, retired_dir)
+    os.rename(staging_dir, output_dir)
+    shutil.rmtree(retired_dir)
+
+
+def exchange_paths(first, second):
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError, TypeError):
+        return False
+    result = renameat2(
+        AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE
+    )
+    if result == 0:
+        return True
+    error = ctypes.get_errno()
+    # Old kernels and some filesystems don't support the exchange flag.
+    if error in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(error, os.strerror(error), first, None, second)
+
+
+def snapshot_output(output_dir):
+    snapshot = {}
+    if not os.path.isdir(output_dir):
+        return snapshot
+    for rel_path in walk_files(output_dir):
+        # The build manifest is bookkeeping, not something anyone serves.
+        if rel_path == MANIFEST_FILENAME:
+            continue
+        stat = os.stat(os.path.join(output_dir, rel_path))
+        snapshot[rel_path.replace(os.sep, "/")] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def output_changes(before, after):
+    # Unchanged files are never rewritten, and hardlinked or copy2'd staging
+    # copies keep their mtime, so size and mtime tell exactly what changed.
+    changed = sorted(path for path, stat in after.items() if before.get(path) != stat)
+    removed = sorted(path for path in before if path not in after)
+    return changed, removed
+
+
+def write_changes(path, changed, removed):
+    with open(path, "w") as f:
+        json.dump({"changed": changed, "removed": removed}, f, indent=2)
+
+
+def discard_staging(staging_dir):
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
@@ -0,0 +1,390 @@
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter
+
+from copy_static import replacing_file
+from fingerprint import url_path
+
+SEARCH_DIR = "search-index"
+SEARCH_META_FILENAME = "meta.json"
+SEARCH_VERSION = 1
+
+# Terms are sharded by prefix, starting at two characters. A shard that
+# outgrows the limit is split by one more character, so a browser looking up
+# a term fetches one small file whatever the corpus size. A single term whose
+# postings alone outgrow the limit is split by doc id instead, into parts
+# t/<term>.<n>.json that meta.json lists with the first doc id of each.
+ROOT_PREFIX_LENGTH = 2
+MAX_SHARD_BYTES = 64 * 1024
+DOCS_PER_SHARD = 1024
+# Postings wait in memory up to this size before going to the spill files.
+SPILL_BUFFER_BYTES = 8 * 1024 * 1024
+
+# Letters and digits only, so "_" and other markdown syntax never index.
+TERM_PATTERN = re.compile(r"[^\W_]{2,}")
+
+
+def page_terms(texts):
+    # From the block_text of each block, as the renderers collect them.
+    return text_terms("\n".join(texts))
+
+
+def text_terms(text):
+    return Counter(TERM_PATTERN.findall(text.lower()))
+
+
+def page_url(rel_path, basepath="/"):
+    url = basepath + url_path(rel_path)[1:]
+    if url.endswith("/index.html"):
+        return url[: -len("index.html")]
+    return url
+
+
+class SearchIndex:
+    # Updates the index under dest_dir/search for the pages added or removed
+    # since the last build. Per-page bookkeeping lives in the build manifest,
+    # so only the shards those pages touch are read and rewritten.
+    def __init__(self, dest_dir, manifest, basepath="/"):
+        self.dest_dir = dest_dir
+        self.directory = os.path.join(dest_dir, SEARCH_DIR)
+        self.basepath = basepath
+        self.state = manifest["search"]
+        self.state.setdefault("pages", {})
+        self.state.setdefault("next_id", 0)
+        self.pages = self.state["pages"]
+        self.prefixes = set(self.state.get("prefixes", []))
+        self.parts = dict(self.state.get("parts", {}))
+
+        self.stale_ids = set()
+        self.term_shards = set()
+        self.doc_shards = set()
+        self.pending = {}
+        self.pending_bytes = 0
+        self.spill_dir = None
+
+    def add_page(self, src_path, dest_path, title, terms):
+        entry = self.pages.get(src_path)
+        if entry is None:
+            entry = {"id": self.state["next_id"], "shards": []}
+            self.state["next_id"] += 1
+            self.pages[src_path] = entry
+        else:
+            self.forget(entry)
+
+        doc_id = entry["id"]
+        shards = set()
+        # Terms are letters and digits only, so postings spill as plain
+        # tab separated lines instead of going through JSON one by one.
+        for term, count in terms.items():
+            prefix = self.shard_for(term)
+            shards.add(prefix)
+            self.spill("t", prefix, f"{term}\t{doc_id}\t{count}\n")
+        url = page_url(os.path.relpath(dest_path, self.dest_dir), self.basepath)
+        doc = json.dumps([doc_id, url, title]) + "\n"
+        self.spill("d", doc_id // DOCS_PER_SHARD, doc)
+
+        entry["shards"] = sorted(shards)
+        self.term_shards.update(shards)
+        self.doc_shards.add(doc_id // DOCS_PER_SHARD)
+
+    def remove_page(self, src_path):
+        entry = self.pages.pop(src_path, None)
+        if entry is not None:
+            self.forget(entry)
+
+    def forget(self, entry):
+        self.stale_ids.add(entry["id"])
+        self.term_shards.update(entry["shards"])
+        self.doc_shards.add(entry["id"] // DOCS_PER_SHARD)
+
+    def shard_for(self, term):
+        for length in range(len(term), ROOT_PREFIX_LENGTH, -1):
+            if term[:length] in self.prefixes:
+                return term[:length]
+        return term[:ROOT_PREFIX_LENGTH]
+
+    def spill(self, kind, shard, line):
+        self.pending.setdefault((kind, shard), []).append(line)
+        self.pending_bytes += len(line)
+        if self.pending_bytes > SPILL_BUFFER_BYTES:
+            self.flush()
+
+    def flush(self):
+        for key, lines in self.pending.items():
+            with open(self.scratch_path(self.spill_name(key)), "a") as f:
+                f.writelines(lines)
+        self.pending = {}
+        self.pending_bytes = 0
+
+    def scratch_path(self, name):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="search-")
+        return os.path.join(self.spill_dir, name)
+
+    def spill_name(self, key):
+        kind, shard = key
+        return f"{kind}-{shard}.jsonl"
+
+    def read_spill(self, kind, shard):
+        # Whatever is still buffered, then whatever went to disk, one line
+        # at a time.
+        key = (kind, shard)
+        yield from self.pending.get(key, [])
+        if self.spill_dir is None:
+            return
+        path = os.path.join(self.spill_dir, self.spill_name(key))
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                yield from f
+
+    def finish(self):
+        # Small updates never go through the spill files.
+        if self.spill_dir is not None:
+            self.flush()
+
+        # A split shard handed its terms to longer prefixes, which then hold
+        # whatever the pages recorded under the shorter one.
+        touched = set(self.term_shards)
+        for prefix in self.prefixes:
+            for length in range(ROOT_PREFIX_LENGTH, len(prefix)):
+                if prefix[:length] in self.term_shards:
+                    touched.add(prefix)
+        for prefix in sorted(touched):
+            self.update_term_shard(prefix)
+        for number in sorted(self.doc_shards):
+            self.update_doc_shard(number)
+
+        self.state["prefixes"] = sorted(self.prefixes)
+        self.state["parts"] = dict(sorted(self.parts.items()))
+        meta = {
+            "version": SEARCH_VERSION,
+            "prefixes": self.state["prefixes"],
+            "parts": self.state["parts"],
+            "docs_per_shard": DOCS_PER_SHARD,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        with replacing_file(os.path.join(self.directory, SEARCH_META_FILENAME)) as f:
+            json.dump(meta, f, separators=(",", ":"))
+
+    def close(self):
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir)
+            self.spill_dir = None
+
+    def update_term_shard(self, prefix):
+        # Each term maps to a flat [doc id, count, doc id, count, ...] list,
+        # kept in doc id order. The old postings and the spill are merged as
+        # sorted streams into a scratch file, noting only the size of each
+        # term, then that file is written out shard by shard.
+        merged_path = self.scratch_path(f"merged-{prefix}")
+        sizes = {}
+        with open(merged_path, "w") as merged:
+            postings = heapq.merge(self.kept_postings(prefix), self.spilled(prefix))
+            for term, group in itertools.groupby(postings, key=lambda p: p[0]):
+                # The '"term":[]' around the values and a comma after each.
+                size = len(term) + 5
+                for _, doc_id, count in group:
+                    merged.write(f"{term}\t{doc_id}\t{count}\n")
+                    size += len(str(doc_id)) + len(str(count)) + 2
+                sizes[term] = size - 1
+
+        prefixes, parted = split_prefixes(prefix, sizes)
+        if prefix not in parted:
+            self.write_term_parts(prefix, [])
+        with open(merged_path, "r") as merged:
+            self.write_term_shards(prefixes, parted, iter_postings(merged))
+        os.remove(merged_path)
+        if prefix not in prefixes:
+            self.write_term_shard(prefix, {})
+
+    def kept_postings(self, prefix):
+        # The postings already in the index for this shard, minus the pages
+        # being replaced or removed, in (term, doc id) order. Parts belong to
+        # the term equal to the prefix, which sorts before all the others.
+        parts = range(len(self.parts.get(prefix, [])))
+        paths = [self.term_shard_path(prefix, n) for n in parts]
+        for path in [*paths, self.term_shard_path(prefix)]:
+            shard = read_shard(path)
+            for term in sorted(shard):
+                flat = shard[term]
+                for doc_id, count in zip(flat[0::2], flat[1::2]):
+                    if doc_id not in self.stale_ids:
+                        yield term, doc_id, count
+
+    def spilled(self, prefix):
+        # The spilled postings, sorted a buffer's worth at a time: each full
+        # buffer goes out as a sorted run, and the runs are merged lazily.
+        runs = []
+        chunk = []
+        chunk_bytes = 0
+        for line in self.read_spill("t", prefix):
+            chunk.append(parse_posting(line))
+            chunk_bytes += len(line)
+            if chunk_bytes > SPILL_BUFFER_BYTES:
+                path = self.scratch_path(f"run-{prefix}-{len(runs)}")
+                with open(path, "w") as run:
+                    run.writelines(f"{t}\t{i}\t{c}\n" for t, i, c in sorted(chunk))
+                runs.append(path)
+                chunk = []
+                chunk_bytes = 0
+        chunk.sort()
+        with contextlib.ExitStack() as files:
+            streams = [iter_postings(files.enter_context(open(path))) for path in runs]
+            yield from heapq.merge(chunk, *streams)
+        for path in runs:
+            os.remove(path)
+
+    def write_term_shards(self, prefixes, parted, postings):
+        # Terms arrive sorted, so every term under a shard's prefix is seen
+        # before the next shard starts; at most one open shard per prefix
+        # length is held at a time.
+        open_shards = []
+        for term, group in itertools.groupby(postings, key=lambda p: p[0]):
+            while open_shards and not term.startswith(open_shards[-1][0]):
+                self.write_term_shard(*open_shards.pop())
+            shard = longest_prefix(term, prefixes)
+            if not open_shards or open_shards[-1][0] != shard:
+                open_shards.append((shard, {}))
+            if term in parted:
+                self.write_term_parts(term, group)
+                continue
+            flat = []
+            for _, doc_id, count in group:
+                flat.extend((doc_id, count))
+            open_shards[-1][1][term] = flat
+        while open_shards:
+            self.write_term_shard(*open_shards.pop())
+
+    def write_term_shard(self, prefix, postings):
+        path = self.term_shard_path(prefix)
+        if not postings and prefix not in self.parts:
+            self.prefixes.discard(prefix)
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        self.prefixes.add(prefix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with replacing_file(path) as f:
+            f.write(encode_shard(postings))
+
+    def write_term_parts(self, term, postings):
+        # Consecutive doc id ranges, each as big as fits in one shard.
+        starts = []
+        flat = []
+        size = len(encode_shard({term: []}))
+        for _, doc_id, count in postings:
+            pair_size = len(str(doc_id)) + len(str(count)) + 2
+            if flat and size + pair_size > MAX_SHARD_BYTES:
+                self.write_term_part(term, len(starts) - 1, flat)
+                flat = []
+                size = len(encode_shard({term: []}))
+            if not flat:
+                starts.append(doc_id)
+            flat.extend((doc_id, count))
+            size += pair_size
+        if flat:
+            self.write_term_part(term, len(starts) - 1, flat)
+
+        for n in range(len(starts), len(self.parts.get(term, []))):
+            os.remove(self.term_shard_path(term, n))
+        if starts:
+            self.parts[term] = starts
+        else:
+            self.parts.pop(term, None)
+
+    def write_term_part(self, term, n, flat):
+        path = self.term_shard_path(term, n)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with replacing_file(path) as f:
+            f.write(encode_shard({term: flat}))
+
+    def update_doc_shard(self, number):
+        path = os.path.join(self.directory, "d", f"{number}.json")
+        docs = {
+            doc_id: doc
+            for doc_id, doc in read_shard(path).items()
+            if int(doc_id) not in self.stale_ids
+        }
+        for line in self.read_spill("d", number):
+            doc_id, url, title = json.loads(line)
+            docs[str(doc_id)] = [url, title]
+
+        if not docs:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with replacing_file(path) as f:
+            f.write(encode_shard(docs))
+
+    def term_shard_path(self, prefix, part=None):
+        if part is None:
+            return os.path.join(self.directory, "t", f"{prefix}.json")
+        return os.path.join(self.directory, "t", f"{prefix}.{part}.json")
+
+
+def split_prefixes(prefix, sizes):
+    # How a shard over the limit splits, worked out from the encoded size
+    # of each term's entry: the prefixes the terms end up under, and the
+    # terms too big for a shard of their own.
+    if 2 + sum(sizes.values()) + len(sizes) - 1 <= MAX_SHARD_BYTES:
+        return {prefix} if sizes else set(), set()
+    children = {}
+    for term, size in sizes.items():
+        if len(term) > len(prefix):
+            children.setdefault(term[: len(prefix) + 1], {})[term] = size
+    prefixes = set()
+    parted = set()
+    for child, child_sizes in children.items():
+        child_prefixes, child_parted = split_prefixes(child, child_sizes)
+        prefixes |= child_prefixes
+        parted |= child_parted
+    if prefix in sizes:
+        prefixes.add(prefix)
+        if sizes[prefix] + 2 > MAX_SHARD_BYTES:
+            parted.add(prefix)
+    return prefixes, parted
+
+
+def longest_prefix(term, prefixes):
+    for length in range(len(term), 0, -1):
+        if term[:length] in prefixes:
+            return term[:length]
+    return None
+
+
+def parse_posting(line):
+    term, doc_id, count = line.split("\t")
+    return term, int(doc_id), int(count)
+
+
+def iter_postings(lines):
+    for line in lines:
+        yield parse_posting(line)
+
+
+def read_shard(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def encode_shard(shard):
+    return json.dumps(shard, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+
+
+def remove_search_index(dest, manifest):
+    if not manifest["search"]:
+        return
+    manifest["search"] = {}
+    directory = os.path.join(dest, SEARCH_DIR)
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
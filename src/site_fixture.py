@@ -0,0 +1,46 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from generation import generate_pages_incremental
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+class SiteTestCase(unittest.TestCase):
+    # A throwaway site under a temporary root: content/ with a home page,
+    # an empty static/, the template, and docs/ as the output directory.
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.output = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(self.static)
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def build(self, output=None, basepath="/", **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_pages_incremental(
+                self.content,
+                self.template,
+                output or self.output,
+                basepath,
+                **options,
+            )
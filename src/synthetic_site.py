@@ -0,0 +1,142 @@
+import os
+import random
+
+WORDS = (
+    "ring shire elf dwarf hobbit wizard river mountain forest road tower king "
+    "sword shadow light star song tale journey fellowship council ford bridge "
+    "valley hall gate stone fire water wind tree leaf night morning"
+).split()
+
+TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+class SiteConfig:
+    def __init__(
+        self,
+        pages=100,
+        blocks_per_page=20,
+        paragraph_words=80,
+        link_density=0.05,
+        list_ratio=0.15,
+        code_ratio=0.1,
+        depth=2,
+        static_files=20,
+        static_file_size=64 * 1024,
+        seed=0,
+    ):
+        self.pages = pages
+        self.blocks_per_page = blocks_per_page
+        self.paragraph_words = paragraph_words
+        self.link_density = link_density
+        self.list_ratio = list_ratio
+        self.code_ratio = code_ratio
+        self.depth = depth
+        self.static_files = static_files
+        self.static_file_size = static_file_size
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def generate_site(root, config):
+    rng = random.Random(config.seed)
+    content_dir = os.path.join(root, "content")
+    static_dir = os.path.join(root, "static")
+    template_path = os.path.join(root, "template.html")
+
+    page_paths = [page_path(i, config.depth) for i in range(config.pages)]
+    for i, rel_path in enumerate(page_paths):
+        path = os.path.join(content_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(make_page(rng, config, i, page_paths))
+
+    os.makedirs(os.path.join(static_dir, "images"), exist_ok=True)
+    with open(os.path.join(static_dir, "index.css"), "w") as f:
+        f.write("body { font-family: serif; }\n" * 200)
+    for i in range(config.static_files):
+        with open(os.path.join(static_dir, "images", f"image-{i}.png"), "wb") as f:
+            f.write(rng.randbytes(config.static_file_size))
+
+    with open(template_path, "w") as f:
+        f.write(TEMPLATE)
+
+    return content_dir, static_dir, template_path
+
+
+def page_path(index, depth):
+    # Spread pages over nested section directories, e.g. s3/s1/page-42/index.md
+    parts = [f"s{(index // 10**level) % 10}" for level in range(depth, 0, -1)]
+    return os.path.join(*parts, f"page-{index}", "index.md")
+
+
+def make_page(rng, config, index, page_paths):
+    blocks = [f"# Page {index} about the {rng.choice(WORDS)}"]
+    for _ in range(config.blocks_per_page):
+        roll = rng.random()
+        if roll < config.code_ratio:
+            blocks.append(make_code_block(rng))
+        elif roll < config.code_ratio + config.list_ratio:
+            blocks.append(make_list(rng, config, page_paths))
+        elif roll < config.code_ratio + config.list_ratio + 0.05:
+            blocks.append(f"## The {rng.choice(WORDS)} and the {rng.choice(WORDS)}")
+        else:
+            blocks.append(make_paragraph(rng, config, page_paths))
+    return "\n\n".join(blocks) + "\n"
+
+
+def make_inline(rng, config, page_paths, word_count):
+    words = []
+    for _ in range(word_count):
+        roll = rng.random()
+        word = rng.choice(WORDS)
+        if roll < config.link_density:
+            target = os.path.dirname(rng.choice(page_paths))
+            words.append(f"[{word}](/{target})")
+        elif roll < config.link_density + 0.03:
+            words.append(f"**{word}**")
+        elif roll < config.link_density + 0.06:
+            words.append(f"_{word}_")
+        elif roll < config.link_density + 0.08:
+            words.append(f"`{word}`")
+        else:
+            words.append(word)
+    return " ".join(words)
+
+
+def make_paragraph(rng, config, page_paths):
+    text = make_inline(rng, config, page_paths, config.paragraph_words)
+    # Wrap lines like a hand-written document would.
+    words = text.split(" ")
+    lines = [" ".join(words[i : i + 12]) for i in range(0, len(words), 12)]
+    return "\n".join(lines)
+
+
+def make_list(rng, config, page_paths):
+    items = [
+        make_inline(rng, config, page_paths, rng.randint(3, 12))
+        for _ in range(rng.randint(2, 8))
+    ]
+    if rng.random() < 0.5:
+        return "\n".join(f"- {item}" for item in items)
+    return "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
+
+
+def make_code_block(rng):
+    lines = [
+        f"def {rng.choice(WORDS)}():",
+        f"    return '{rng.choice(WORDS)}'",
+    ]
+    return "```\n" + "\n".join(lines) + "\n```"
@@ -0,0 +1,93 @@
+import re
+
+from htmlnode import resolve_url, writer_for
+from minify import minify_html
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+URL_ATTRIBUTE_PATTERN = re.compile(r'\b(href|src)="(/[^"]*)"')
+
+
+class Template:
+    def __init__(self, fragments: list, slots: list, basepath="/", assets=None):
+        if len(fragments) != len(slots) + 1:
+            raise ValueError("template needs exactly one more fragment than slots")
+        self.fragments = fragments
+        self.slots = slots
+        self.basepath = basepath
+        self.assets = assets
+
+    @classmethod
+    def compile(cls, source: str, basepath="/", assets=None, minify=False):
+        source = rewrite_basepath(source, basepath, assets)
+        if minify:
+            source = minify_html(source)
+
+        fragments = []
+        slots = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            fragments.append(source[position : match.start()])
+            slots.append(match.group(1))
+            position = match.end()
+        fragments.append(source[position:])
+        return cls(fragments, slots, basepath, assets)
+
+    def render(self, **values):
+        parts = [self.fragments[0]]
+        for slot, fragment in zip(self.slots, self.fragments[1:]):
+            if slot not in values:
+                raise KeyError(f"missing value for template slot: {slot}")
+            parts.append(values[slot])
+            parts.append(fragment)
+        return "".join(parts)
+
+    def write(self, out, **values):
+        write = writer_for(out)
+        write(self.fragments[0])
+        for slot, fragment in zip(self.slots, self.fragments[1:]):
+            if slot not in values:
+                raise KeyError(f"missing value for template slot: {slot}")
+            write_value(write, values[slot], self.basepath, self.assets)
+            write(fragment)
+
+    def __eq__(self, other):
+        return (
+            self.fragments == other.fragments
+            and self.slots == other.slots
+            and self.basepath == other.basepath
+            and self.assets == other.assets
+        )
+
+    def __repr__(self):
+        return f"Template({self.fragments}, slots: {self.slots}, {self.basepath})"
+
+
+def write_value(write, value, basepath="/", assets=None):
+    if isinstance(value, str):
+        write(value)
+    elif hasattr(value, "emit_html"):
+        value.emit_html(write, basepath, assets)
+    else:
+        value(write)
+
+
+def load_template(template_path, basepath="/", assets=None, minify=False):
+    with open(template_path, "r") as template:
+        return Template.compile(template.read(), basepath, assets, minify)
+
+
+def template_references(template_path):
+    with open(template_path, "r") as template:
+        source = template.read()
+    return {match.group(2) for match in URL_ATTRIBUTE_PATTERN.finditer(source)}
+
+
+def rewrite_basepath(html, basepath, assets=None):
+    if basepath == "/" and not assets:
+        return html
+
+    def resolve(match):
+        url = resolve_url(match.group(2), basepath, assets)
+        return f'{match.group(1)}="{url}"'
+
+    return URL_ATTRIBUTE_PATTERN.sub(resolve, html)
@@ -1,12 +1,25 @@
+import glob
+import os
+import tempfile
 import unittest
 
 from block_markdown import (
     BlockType,
+    block_inline_texts,
     block_to_block_type,
+    document_title,
     extract_title,
+    iter_blocks,
+    iter_lines,
     markdown_to_blocks,
     markdown_to_html_node,
+    markdown_to_html_node_multipass,
+    parse_markdown,
+    render_document,
+    render_markdown,
+    scan_blocks,
 )
+from synthetic_site import SiteConfig, generate_site
 
 
 class TestBlockMarkdown(unittest.TestCase):
@@ -203,6 +216,150 @@ Paragraph after list.
             "<div><ol><li>One item <b>bold</b></li><li>Two item <code>code</code></li><li>Three item</li></ol><p>Paragraph after list.</p></div>",
         )
 
+    def test_scan_blocks(self):
+        md = "# Title\n\n```\ncode\n\nmore\n```\n  \n- a\n- b\n\n> quote"
+        self.assertListEqual(
+            scan_blocks(md),
+            [
+                (BlockType.HEADING, ["# Title"]),
+                (BlockType.CODE, ["```", "code", "", "more", "```"]),
+                (BlockType.UNORDERED_LIST, ["- a", "- b"]),
+                (BlockType.QUOTE, ["> quote"]),
+            ],
+        )
+
+    def test_scan_blocks_unclosed_fence(self):
+        self.assertListEqual(
+            scan_blocks("```\ncode\n\ntext"),
+            [
+                (BlockType.PARAGRAPH, ["```", "code"]),
+                (BlockType.PARAGRAPH, ["text"]),
+            ],
+        )
+
+    def test_iter_blocks_from_file_lines(self):
+        md = "# Title\n\n```\ncode\n\nmore\n```\n\n- a\n- b  \n\n```\nopen\n\ntext\n"
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "page.md")
+            with open(path, "w") as f:
+                f.write(md)
+            with open(path) as f:
+                self.assertListEqual(list(iter_blocks(iter_lines(f))), scan_blocks(md))
+
+    def test_scan_matches_multipass_on_content(self):
+        content_dir = os.path.join(os.path.dirname(__file__), "..", "content")
+        paths = glob.glob(os.path.join(content_dir, "**", "*.md"), recursive=True)
+        self.assertTrue(paths)
+        for path in paths:
+            with open(path) as f:
+                md = f.read()
+            self.assertEqual(
+                markdown_to_html_node(md).to_html(),
+                markdown_to_html_node_multipass(md).to_html(),
+                path,
+            )
+
+    def test_scan_matches_multipass_on_synthetic_site(self):
+        config = SiteConfig(pages=40, static_files=0)
+        with tempfile.TemporaryDirectory() as root:
+            content_dir, _, _ = generate_site(root, config)
+            pattern = os.path.join(content_dir, "**", "*.md")
+            for path in glob.glob(pattern, recursive=True):
+                with open(path) as f:
+                    md = f.read()
+                self.assertEqual(
+                    markdown_to_html_node(md).to_html(),
+                    markdown_to_html_node_multipass(md).to_html(),
+                    path,
+                )
+
+    def assertRendersLikeNodes(self, md, label=None):
+        for basepath in ("/", "/ssg/"):
+            self.assertEqual(
+                render_markdown(md, basepath),
+                markdown_to_html_node(md).to_html(basepath),
+                label,
+            )
+
+    def test_render_markdown_matches_nodes_on_content(self):
+        content_dir = os.path.join(os.path.dirname(__file__), "..", "content")
+        pattern = os.path.join(content_dir, "**", "*.md")
+        for path in glob.glob(pattern, recursive=True):
+            with open(path) as f:
+                self.assertRendersLikeNodes(f.read(), path)
+
+    def test_render_markdown_matches_nodes_on_synthetic_site(self):
+        config = SiteConfig(pages=40, static_files=0)
+        with tempfile.TemporaryDirectory() as root:
+            content_dir, _, _ = generate_site(root, config)
+            pattern = os.path.join(content_dir, "**", "*.md")
+            for path in glob.glob(pattern, recursive=True):
+                with open(path) as f:
+                    self.assertRendersLikeNodes(f.read(), path)
+
+    def test_render_markdown_with_assets(self):
+        md = "# T\n\n![a](/a.png) [b](/b)"
+        assets = {"/a.png": "/a.0123456789.png"}
+        self.assertEqual(
+            render_markdown(md, "/ssg/", assets),
+            markdown_to_html_node(md).to_html("/ssg/", assets),
+        )
+
+    def test_render_markdown_errors_like_nodes(self):
+        for md in ("", "- \n- item", "Some **unclosed bold", "****"):
+            with self.assertRaises(ValueError, msg=repr(md)):
+                markdown_to_html_node(md).to_html()
+            with self.assertRaises(ValueError, msg=repr(md)):
+                render_markdown(md)
+
+    def test_block_inline_texts(self):
+        cases = [
+            (BlockType.HEADING, ["## A [b](/b)"], ["A [b](/b)"]),
+            (BlockType.QUOTE, ["> one", ">two"], ["one", "two"]),
+            (BlockType.UNORDERED_LIST, ["- a", "- b"], ["a", "b"]),
+            (BlockType.ORDERED_LIST, ["1. a", "2. b"], ["a", "b"]),
+            (BlockType.PARAGRAPH, ["a", "b"], ["a", "b"]),
+        ]
+        for block_type, lines, texts in cases:
+            self.assertListEqual(block_inline_texts(block_type, lines), texts)
+
+    def test_render_document_title(self):
+        md = "```\n# not a title\n```\n\n## Sub\n\n# Real\n\n# Second"
+        self.assertEqual(render_document(md).title, "Real")
+        self.assertIsNone(render_document("Intro\n# Inline").title)
+
+    def test_render_document_matches_parse_markdown(self):
+        md = (
+            "# Title\n\nSome **bold** words\n\n## Part one\n\n"
+            "- a b\n- c\n\n```\nx y\n```"
+        )
+        parsed = parse_markdown(md)
+        rendered = render_document(md)
+        self.assertEqual(rendered.root, parsed.root.to_html())
+        self.assertListEqual(rendered.outline, parsed.outline)
+        self.assertEqual(rendered.word_count, parsed.word_count)
+
+    def test_parse_markdown(self):
+        md = (
+            "# Title\n\nSome **bold** words\n\n## Part one\n\n"
+            "- a b\n- c\n\n```\nx y\n```"
+        )
+        document = parse_markdown(md)
+        self.assertEqual(document.title, "Title")
+        self.assertListEqual(document.outline, [(1, "Title"), (2, "Part one")])
+        self.assertEqual(document.word_count, 9)
+        self.assertEqual(document.root.to_html(), markdown_to_html_node(md).to_html())
+
+    def test_document_title_skips_code(self):
+        md = "```\n# not a title\n```\n\n# Real"
+        self.assertEqual(document_title(parse_markdown(md), md), "Real")
+
+    def test_document_title_falls_back_to_lines(self):
+        md = "Intro text\n# Inline title"
+        document = parse_markdown(md)
+        self.assertIsNone(document.title)
+        self.assertEqual(document_title(document, md), "Inline title")
+
     def test_extract_title(self):
         markdown_content = """
 # This is the Main Title
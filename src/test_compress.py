@@ -0,0 +1,103 @@
+import gzip
+import os
+import unittest
+
+from compress import (
+    available_encoders,
+    compress_outputs,
+    gzip_encode,
+    remove_sidecars,
+)
+from manifest import empty_manifest
+from site_fixture import SiteTestCase
+
+
+class TestCompressOutputs(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = os.path.join(self.output, "blog", "index.html")
+        self.write(self.page, "<p>hello</p>" * 50)
+        self.css = os.path.join(self.output, "index.css")
+        self.write(self.css, "body {}")
+        self.write(os.path.join(self.output, "a.png"), "png")
+        self.write(os.path.join(self.output, ".build-manifest.json"), "{}")
+
+    def compress(self, jobs=1):
+        return compress_outputs(self.output, jobs, {".gz": gzip_encode})
+
+    def test_writes_gzip_sidecars(self):
+        written = self.compress()
+        self.assertListEqual(
+            sorted(written), sorted([self.page + ".gz", self.css + ".gz"])
+        )
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 50)
+        self.assertEqual(
+            os.stat(self.page + ".gz").st_mtime_ns, os.stat(self.page).st_mtime_ns
+        )
+
+    def test_current_sidecars_are_skipped(self):
+        self.compress()
+        self.assertListEqual(self.compress(), [])
+
+    def test_changed_file_is_recompressed(self):
+        self.compress()
+        self.write(self.page, "<p>changed</p>")
+        os.utime(self.page, ns=(0, 10**9))
+        self.assertListEqual(self.compress(jobs=4), [self.page + ".gz"])
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>changed</p>")
+
+    def test_output_is_reproducible(self):
+        self.compress()
+        with open(self.page + ".gz", "rb") as f:
+            first = f.read()
+        os.remove(self.page + ".gz")
+        self.compress()
+        with open(self.page + ".gz", "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_orphaned_sidecar_is_removed(self):
+        self.compress()
+        os.remove(self.page)
+        self.compress()
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.output, "blog")))
+
+    def test_stale_sidecar_without_encoder_is_removed(self):
+        self.compress()
+        os.utime(self.page, ns=(0, 10**9))
+        compress_outputs(self.output, encoders={})
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertTrue(os.path.exists(self.css + ".gz"))
+
+    def test_remove_sidecars(self):
+        self.compress()
+        self.write(os.path.join(self.output, "archive.tar.gz"), "tar")
+        remove_sidecars(self.output)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertFalse(os.path.exists(self.css + ".gz"))
+        self.assertTrue(os.path.exists(os.path.join(self.output, "archive.tar.gz")))
+
+    def test_static_files_named_like_sidecars_are_kept(self):
+        data = os.path.join(self.output, "data.json.gz")
+        self.write(data, "static")
+        self.write(self.css + ".gz", "static")
+        manifest = empty_manifest()
+        manifest["assets"] = {"data.json.gz": {}, "index.css.gz": {}}
+
+        written = compress_outputs(self.output, 1, {".gz": gzip_encode}, manifest)
+        self.assertListEqual(written, [self.page + ".gz"])
+        remove_sidecars(self.output, manifest)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        with open(data) as f:
+            self.assertEqual(f.read(), "static")
+        with open(self.css + ".gz") as f:
+            self.assertEqual(f.read(), "static")
+
+    def test_gzip_is_always_available(self):
+        self.assertIn(".gz", available_encoders())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from copy_static import is_same_content, replacing_file, sync_directory
+from manifest import load_manifest
+from site_fixture import SiteTestCase
+
+
+class ShortenPngs:
+    def pipeline_for(self, path):
+        return "short-1" if path.endswith(".png") else None
+
+    def optimize(self, src_path, dest_path):
+        with open(src_path) as src, open(dest_path, "w") as dest:
+            dest.write(src.read()[:1])
+
+
+class TestSyncDirectory(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def sync(self, use_hash=False, optimizers=()):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sync_directory(
+                self.static, self.output, use_hash, optimizers=optimizers
+            )
+
+    def test_first_sync_copies_everything(self):
+        copied, removed = self.sync()
+        self.assertEqual(len(copied), 2)
+        self.assertListEqual(removed, [])
+        self.assertEqual(
+            os.stat(os.path.join(self.output, "index.css")).st_mtime_ns,
+            os.stat(os.path.join(self.static, "index.css")).st_mtime_ns,
+        )
+        self.assertEqual(len(load_manifest(self.output)["assets"]), 2)
+
+    def test_resync_copies_nothing(self):
+        self.sync()
+        self.assertEqual(self.sync(), ([], []))
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        copied, _ = self.sync()
+        self.assertListEqual(copied, [os.path.join(self.output, "index.css")])
+
+    def test_touched_file_with_hash_is_skipped(self):
+        self.sync(use_hash=True)
+        path = os.path.join(self.static, "index.css")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.sync(use_hash=True), ([], []))
+        self.assertEqual(self.sync(use_hash=True), ([], []))
+
+    def test_missing_copy_is_restored(self):
+        self.sync()
+        os.remove(os.path.join(self.output, "index.css"))
+        copied, _ = self.sync()
+        self.assertListEqual(copied, [os.path.join(self.output, "index.css")])
+
+    def test_deleted_file_is_removed_and_pages_are_kept(self):
+        self.sync()
+        page = os.path.join(self.output, "index.html")
+        self.write(page, "<html></html>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        _, removed = self.sync()
+        self.assertListEqual(removed, [os.path.join(self.output, "images", "a.png")])
+        self.assertFalse(os.path.exists(os.path.join(self.output, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_optimized_copy_is_kept(self):
+        png = os.path.join(self.output, "images", "a.png")
+        copied, _ = self.sync(optimizers=[ShortenPngs()])
+        self.assertIn(png, copied)
+        with open(png) as f:
+            self.assertEqual(f.read(), "p")
+        self.assertEqual(self.sync(optimizers=[ShortenPngs()]), ([], []))
+
+    def test_toggling_optimizer_recopies(self):
+        png = os.path.join(self.output, "images", "a.png")
+        self.sync()
+        self.assertListEqual(self.sync(optimizers=[ShortenPngs()])[0], [png])
+        self.assertListEqual(self.sync()[0], [png])
+        with open(png) as f:
+            self.assertEqual(f.read(), "png")
+
+    def test_missing_source(self):
+        with self.assertRaises(FileNotFoundError):
+            sync_directory(os.path.join(self.root, "nope"), self.output)
+
+
+class TestReplacingFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.html")
+        with open(self.path, "w") as f:
+            f.write("<p>old</p>")
+        os.utime(self.path, ns=(0, 0))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_changed_content_replaces_file(self):
+        with replacing_file(self.path) as f:
+            f.write("<p>new</p>")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<p>new</p>")
+        self.assertNotEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertListEqual(os.listdir(self.tmp.name), ["page.html"])
+
+    def test_identical_content_keeps_file(self):
+        inode = os.stat(self.path).st_ino
+        with replacing_file(self.path) as f:
+            f.write("<p>old</p>")
+        stat = os.stat(self.path)
+        self.assertEqual((stat.st_ino, stat.st_mtime_ns), (inode, 0))
+        self.assertListEqual(os.listdir(self.tmp.name), ["page.html"])
+
+    def test_failed_write_keeps_file(self):
+        with self.assertRaises(ValueError):
+            with replacing_file(self.path) as f:
+                f.write("<p>half")
+                raise ValueError("render failed")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<p>old</p>")
+        self.assertListEqual(os.listdir(self.tmp.name), ["page.html"])
+
+    def test_is_same_content_compares_in_chunks(self):
+        other = os.path.join(self.tmp.name, "other.html")
+        for text, expected in (("<p>old</p>", True), ("<p>odd</p>", False)):
+            with open(other, "w") as f:
+                f.write(text)
+            self.assertEqual(is_same_content(self.path, other, chunk_size=3), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
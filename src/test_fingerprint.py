@@ -0,0 +1,91 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+from copy_static import sync_directory
+from fingerprint import (
+    ASSET_MANIFEST_FILENAME,
+    assets_hash,
+    fingerprint_assets,
+    fingerprinted_path,
+    remove_fingerprints,
+)
+from manifest import load_manifest
+from site_fixture import SiteTestCase
+
+
+class TestFingerprintAssets(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def build(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_directory(self.static, self.output)
+        return fingerprint_assets(self.output)
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(
+            fingerprinted_path(os.path.join("css", "site.css"), "abcdef0123456789"),
+            os.path.join("css", "site.abcdef0123.css"),
+        )
+        self.assertEqual(
+            fingerprinted_path("LICENSE", "abcdef0123456789"), "LICENSE.abcdef0123"
+        )
+
+    def test_assets_are_fingerprinted(self):
+        assets = self.build()
+        self.assertListEqual(sorted(assets), ["/images/a.png", "/index.css"])
+        css = assets["/index.css"]
+        self.assertRegex(css, r"^/index\.[0-9a-f]{10}\.css$")
+        self.assertEqual(self.read(os.path.join(self.output, css[1:])), "body {}")
+        self.assertEqual(self.read(os.path.join(self.output, "index.css")), "body {}")
+
+        with open(os.path.join(self.output, ASSET_MANIFEST_FILENAME)) as f:
+            self.assertEqual(json.load(f), assets)
+
+    def test_unchanged_assets_keep_their_names(self):
+        first = self.build()
+        self.assertEqual(self.build(), first)
+
+    def test_changed_asset_replaces_old_name(self):
+        old = self.build()["/index.css"]
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        new = self.build()["/index.css"]
+        self.assertNotEqual(new, old)
+        self.assertFalse(os.path.exists(os.path.join(self.output, old[1:])))
+        self.assertEqual(
+            self.read(os.path.join(self.output, new[1:])), "body { margin: 0 }"
+        )
+
+    def test_deleted_asset_is_removed(self):
+        png = self.build()["/images/a.png"]
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertNotIn("/images/a.png", self.build())
+        self.assertFalse(os.path.exists(os.path.join(self.output, "images")))
+        self.assertFalse(os.path.exists(os.path.join(self.output, png[1:])))
+
+    def test_remove_fingerprints(self):
+        assets = self.build()
+        remove_fingerprints(self.output)
+        for url in assets.values():
+            self.assertFalse(os.path.exists(os.path.join(self.output, url[1:])))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.output, ASSET_MANIFEST_FILENAME))
+        )
+        self.assertDictEqual(load_manifest(self.output)["fingerprints"], {})
+        self.assertTrue(os.path.exists(os.path.join(self.output, "index.css")))
+
+    def test_assets_hash(self):
+        self.assertIsNone(assets_hash(None))
+        self.assertIsNone(assets_hash({}))
+        self.assertNotEqual(
+            assets_hash({"/a.css": "/a.1.css"}), assets_hash({"/a.css": "/a.2.css"})
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
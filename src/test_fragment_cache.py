@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import fragment_cache
+from fragment_cache import FragmentCache, cached_fragment, fragment_key
+
+
+class TestFragmentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = FragmentCache(os.path.join(self.tmp.name, "cache"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get(fragment_key("# Nothing")))
+
+    def test_put_and_get(self):
+        key = fragment_key("# Title")
+        self.cache.put(key, {"title": "Title", "html": "<div></div>"})
+        self.assertEqual(
+            self.cache.get(key), {"title": "Title", "html": "<div></div>"}
+        )
+
+    def test_key_depends_on_markdown(self):
+        self.assertEqual(fragment_key("# A"), fragment_key("# A"))
+        self.assertNotEqual(fragment_key("# A"), fragment_key("# B"))
+
+    def test_cached_fragment_parses_on_miss(self):
+        title, html = cached_fragment(self.cache, "# Title\n\nSome **bold**")
+        self.assertEqual(title, "Title")
+        self.assertEqual(html, "<div><h1>Title</h1><p>Some <b>bold</b></p></div>")
+
+    def test_miss_renders_without_nodes_and_stores_metadata(self):
+        markdown = "# Title\n\n## Part\n\nSome **bold** [x](/x)"
+        with mock.patch.object(fragment_cache, "parse_markdown") as parse:
+            cached_fragment(self.cache, markdown)
+        parse.assert_not_called()
+        fragment = self.cache.get(fragment_key(markdown))
+        self.assertEqual(fragment["outline"], [[1, "Title"], [2, "Part"]])
+        self.assertEqual(fragment["word_count"], 5)
+
+    def test_cached_fragment_reuses_hit(self):
+        markdown = "# Title\n\nBody"
+        fragment = {"title": "Cached", "parts": ['<a href="', 'x">x</a>']}
+        self.cache.put(fragment_key(markdown), fragment)
+        self.assertEqual(
+            cached_fragment(self.cache, markdown, "/ssg/"),
+            ("Cached", '<a href="/ssg/x">x</a>'),
+        )
+
+    def test_cached_fragment_fills_basepath(self):
+        markdown = "# Title\n\n[home](/) and [post](/blog/post)"
+        expected = (
+            '<div><h1>Title</h1><p><a href="{0}">home</a> and '
+            '<a href="{0}blog/post">post</a></p></div>'
+        )
+        for basepath in ("/", "/ssg/", "/docs/"):
+            _, html = cached_fragment(self.cache, markdown, basepath)
+            self.assertEqual(html, expected.format(basepath))
+
+    def test_cached_fragment_maps_assets(self):
+        markdown = "# Title\n\n![logo](/images/logo.png) and [post](/blog/post)"
+        assets = {"/images/logo.png": "/images/logo.0123456789.png"}
+        expected = (
+            '<div><h1>Title</h1><p><img src="{0}images/logo.0123456789.png" '
+            'alt="logo"></img> and <a href="{0}blog/post">post</a></p></div>'
+        )
+        for basepath in ("/", "/ssg/"):
+            _, html = cached_fragment(self.cache, markdown, basepath, assets)
+            self.assertEqual(html, expected.format(basepath))
+
+    def test_key_depends_on_referenced_image_sizes(self):
+        markdown = "![a](/a.png)"
+        key = fragment_key(markdown, {"/a.png": [1, 2], "/b.png": [3, 4]})
+        self.assertNotEqual(key, fragment_key(markdown))
+        self.assertEqual(key, fragment_key(markdown, {"/a.png": [1, 2]}))
+        self.assertNotEqual(key, fragment_key(markdown, {"/a.png": [2, 2]}))
+
+    def test_cached_fragment_adds_image_attributes(self):
+        markdown = "# Title\n\n![a](/a.png)"
+        images = {"/a.png": [1, 2]}
+        _, html = cached_fragment(self.cache, markdown, "/ssg/", None, images)
+        self.assertEqual(
+            html,
+            '<div><h1>Title</h1><p><img src="/ssg/a.png" alt="a" width="1" '
+            'height="2" decoding="async"></img></p></div>',
+        )
+        _, html = cached_fragment(self.cache, markdown, "/ssg/")
+        self.assertEqual(
+            html, '<div><h1>Title</h1><p><img src="/ssg/a.png" alt="a"></img></p></div>'
+        )
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [fragment_key(f"# Page {i}") for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, {"title": "t", "html": "x" * 100})
+            os.utime(self.cache.path_for(key), ns=(i * 10**9, i * 10**9))
+        size = os.path.getsize(self.cache.path_for(keys[0]))
+
+        self.cache.max_bytes = size * 2
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+
+from fragment_cache import FragmentCache
+from generation import (
+    collect_pages,
+    generate_page,
+    generate_pages,
+)
+from manifest import MANIFEST_FILENAME, load_manifest
+from site_fixture import SiteTestCase
+
+
+class TestIncrementalGeneration(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nBody")
+
+    def test_collect_pages(self):
+        self.assertListEqual(
+            collect_pages(self.content, self.output),
+            [
+                (
+                    os.path.join(self.content, "blog", "post.md"),
+                    os.path.join(self.output, "blog", "post.html"),
+                ),
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(self.output, "index.html"),
+                ),
+            ],
+        )
+
+    def test_first_build_generates_everything(self):
+        self.assertEqual(len(self.build()), 2)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.output, MANIFEST_FILENAME))
+        )
+        self.assertEqual(len(load_manifest(self.output)["pages"]), 2)
+
+    def test_rebuild_skips_unchanged(self):
+        self.build()
+        self.assertListEqual(self.build(), [])
+
+    def test_rebuild_changed_source(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        self.assertListEqual(
+            self.build(), [os.path.join(self.output, "index.html")]
+        )
+
+    def test_rebuild_on_template_or_basepath_change(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(len(self.build()), 2)
+        self.assertEqual(len(self.build(basepath="/ssg/")), 2)
+
+    def test_rebuild_on_parser_version_change(self):
+        self.build()
+        with mock.patch("manifest.PARSER_VERSION", -1):
+            self.assertEqual(len(self.build()), 2)
+            self.assertListEqual(self.build(), [])
+
+    def test_asset_change_rebuilds_only_linking_pages(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        self.write(self.template, '<link href="/site.css">{{ Content }}')
+        assets = {"/a.png": "/a.1.png", "/b.png": "/b.1.png", "/site.css": "/s.1.css"}
+
+        self.assertEqual(len(self.build(assets=assets)), 2)
+        assets["/b.png"] = "/b.2.png"
+        self.assertListEqual(self.build(assets=assets), [])
+        assets["/a.png"] = "/a.2.png"
+        self.assertListEqual(
+            self.build(assets=assets), [os.path.join(self.output, "index.html")]
+        )
+        assets["/site.css"] = "/s.2.css"
+        self.assertEqual(len(self.build(assets=assets)), 2)
+
+    def test_image_change_rebuilds_only_showing_pages(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        images = {"/a.png": [1, 2], "/b.png": [3, 4]}
+
+        self.assertEqual(len(self.build(images=images)), 2)
+        images["/b.png"] = [5, 6]
+        images["/c.png"] = [7, 8]
+        self.assertListEqual(self.build(images=images), [])
+        images["/a.png"] = [9, 10]
+        self.assertListEqual(
+            self.build(images=images), [os.path.join(self.output, "index.html")]
+        )
+        self.assertIn('width="9"', self.read(os.path.join(self.output, "index.html")))
+
+    def test_rebuild_missing_output(self):
+        self.build()
+        os.remove(os.path.join(self.output, "index.html"))
+        self.assertListEqual(
+            self.build(), [os.path.join(self.output, "index.html")]
+        )
+
+    def test_identical_rerender_keeps_output_mtime(self):
+        self.build()
+        index = os.path.join(self.output, "index.html")
+        os.utime(index, ns=(0, 0))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello\n\n")
+        self.assertListEqual(self.build(), [index])
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.output, "blog")))
+        self.assertNotIn(
+            os.path.join(self.content, "blog", "post.md"),
+            load_manifest(self.output)["pages"],
+        )
+
+    def test_parallel_output_matches_serial(self):
+        pages = collect_pages(self.content, self.output)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, "/ssg/", jobs=1)
+        serial = [self.read(dest) for _, dest in pages]
+        for _, dest in pages:
+            os.remove(dest)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, "/ssg/", jobs=2)
+        self.assertListEqual([self.read(dest) for _, dest in pages], serial)
+
+    def test_cached_build_matches_uncached(self):
+        self.build(basepath="/ssg/")
+        uncached = self.read(os.path.join(self.output, "index.html"))
+        cache = FragmentCache(os.path.join(self.root, "cache"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }} ")
+        self.build(basepath="/ssg/", cache=cache)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.build(basepath="/ssg/", cache=cache)
+        self.assertEqual(self.read(os.path.join(self.output, "index.html")), uncached)
+
+
+class TestStreamedGeneration(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write('<title>{{ Title }}</title><a href="/">home</a>{{ Content }}')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, markdown, stream, images=None):
+        src = os.path.join(self.tmp.name, "page.md")
+        with open(src, "w") as f:
+            f.write(markdown)
+        with open(self.generate(src, stream, images)) as f:
+            return f.read()
+
+    def generate(self, src, stream, images=None):
+        dest = os.path.join(self.tmp.name, "out", "page.html")
+        threshold = -1 if stream else 2**62
+        with mock.patch("generation.STREAM_THRESHOLD_BYTES", threshold):
+            generate_page(
+                src,
+                self.template,
+                dest,
+                "/ssg/",
+                log=lambda message: None,
+                images=images,
+            )
+        return dest
+
+    def test_streamed_page_matches_regular(self):
+        markdown = (
+            "Intro with ![a](/a.png)\n\n```\n# not a title\n\ncode\n```\n\n"
+            "# Title\n\n- [one](/one)\n- two\n\n> quote\n\n![b](/b.png)\n"
+        )
+        images = {"/a.png": [1, 2]}
+        for sizes in (None, images):
+            self.assertEqual(
+                self.render(markdown, stream=True, images=sizes),
+                self.render(markdown, stream=False, images=sizes),
+            )
+
+    def test_streamed_title_falls_back_to_lines(self):
+        html = self.render("Intro\n# Inline title", stream=True)
+        self.assertTrue(html.startswith("<title>Inline title</title>"))
+        with self.assertRaises(ValueError):
+            self.render("No title here", stream=True)
+
+    def test_streamed_page_memory_is_bounded(self):
+        src = os.path.join(self.tmp.name, "big.md")
+        with open(src, "w") as f:
+            f.write("# Big\n")
+            for i in range(5000):
+                f.write(f"\nParagraph {i} has **bold** text.\n")
+        peaks = {}
+        for stream in (True, False):
+            tracemalloc.start()
+            try:
+                self.generate(src, stream)
+                peaks[stream] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.assertLess(peaks[True], os.path.getsize(src))
+        self.assertLess(peaks[True] * 10, peaks[False])
+
+
+if __name__ == "__main__":
+    unittest.main()
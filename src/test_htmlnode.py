@@ -1,3 +1,5 @@
+import io
+import pickle
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -24,6 +26,26 @@ class TestHTMLNode(unittest.TestCase):
         )
         self.assertEqual(node.props_to_html(), ' type="text" value="Enter text here"')
 
+    def test_props_to_html_resolves_urls(self):
+        node = HTMLNode("img", "", None, {"src": "/a.png", "alt": "/not-a-url"})
+        self.assertEqual(
+            node.props_to_html("/ssg/"), ' src="/ssg/a.png" alt="/not-a-url"'
+        )
+
+    def test_props_to_html_keeps_external_urls(self):
+        for url in ("https://boot.dev", "//cdn.boot.dev/a.png", "#top", "page.html"):
+            node = HTMLNode("a", "x", None, {"href": url})
+            self.assertEqual(node.props_to_html("/ssg/"), f' href="{url}"')
+
+    def test_props_to_html_maps_assets(self):
+        assets = {"/index.css": "/index.0123456789.css"}
+        node = HTMLNode("link", None, None, {"href": "/index.css"})
+        self.assertEqual(
+            node.props_to_html("/ssg/", assets), ' href="/ssg/index.0123456789.css"'
+        )
+        node = HTMLNode("a", "x", None, {"href": "/blog"})
+        self.assertEqual(node.props_to_html("/", assets), ' href="/blog"')
+
     # LeafNode
 
     def test_leaf_to_html_p(self):
@@ -88,6 +110,61 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
 
+    def test_slots(self):
+        for node in (
+            HTMLNode("p", "text"),
+            LeafNode("b", "bold"),
+            ParentNode("p", [LeafNode(None, "text")]),
+        ):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_pickle_round_trip(self):
+        node = ParentNode("p", [LeafNode("a", "link", {"href": "/x"})])
+        self.assertEqual(pickle.loads(pickle.dumps(node)).to_html(), node.to_html())
+
+    # Streaming
+
+    def test_write_html_to_buffer(self):
+        node = ParentNode(
+            "div",
+            [ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")])],
+            {"class": "post"},
+        )
+        buffer = io.StringIO()
+        node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+        self.assertEqual(
+            buffer.getvalue(), '<div class="post"><p><b>Bold</b> text</p></div>'
+        )
+
+    def test_write_html_to_list(self):
+        node = ParentNode("p", [LeafNode("i", "a"), LeafNode(None, "b")])
+        chunks = []
+        node.write_html(chunks)
+        self.assertListEqual(chunks, ["<p>", "<i>a</i>", "b", "</p>"])
+
+    def test_write_leaf_html(self):
+        chunks = []
+        LeafNode("a", "link", {"href": "/x"}).write_html(chunks)
+        self.assertListEqual(chunks, ['<a href="/x">link</a>'])
+
+    def test_to_html_with_basepath(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "link", {"href": "/blog"}),
+                LeafNode(None, 'literal href="/x" text'),
+            ],
+        )
+        self.assertEqual(
+            node.to_html("/ssg/"),
+            '<p><a href="/ssg/blog">link</a>literal href="/x" text</p>',
+        )
+
+    def test_write_html_no_children(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", []).write_html([])
+
 
 if __name__ == "__main__":
     unittest.main()
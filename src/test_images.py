@@ -0,0 +1,155 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from block_markdown import markdown_to_html_node
+from images import (
+    PNG_SIGNATURE,
+    ImageOptimizer,
+    add_image_attributes,
+    image_size,
+    optimize_png,
+    png_chunk,
+    read_png_chunks,
+)
+
+
+def make_png(width, height, extra_chunks=(), level=0):
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    rows = b"".join(b"\x00" + b"\x10\x20\x30" * width for _ in range(height))
+    chunks = [png_chunk(b"IHDR", header)]
+    chunks.extend(png_chunk(chunk_type, body) for chunk_type, body in extra_chunks)
+    chunks.append(png_chunk(b"IDAT", zlib.compress(rows, level)))
+    chunks.append(png_chunk(b"IEND", b""))
+    return PNG_SIGNATURE + b"".join(chunks)
+
+
+def pixels(data):
+    chunks = read_png_chunks(data)
+    return zlib.decompress(b"".join(body for t, body in chunks if t == b"IDAT"))
+
+
+class TestOptimizePng(unittest.TestCase):
+    def test_recompresses_losslessly(self):
+        data = make_png(64, 32)
+        optimized = optimize_png(data)
+        self.assertLess(len(optimized), len(data))
+        self.assertEqual(pixels(optimized), pixels(data))
+
+    def test_strips_metadata_but_keeps_display_chunks(self):
+        extra_chunks = [
+            (b"sRGB", b"\x00"),
+            (b"cICP", b"\x01\x0d\x00\x01"),
+            (b"eXIf", b"MM\x00\x2a"),
+            (b"tEXt", b"Author\x00me"),
+            (b"tIME", b"\x07\xea\x0a\x12\x00\x00\x00"),
+        ]
+        data = make_png(8, 8, extra_chunks)
+        chunk_types = [t for t, _ in read_png_chunks(optimize_png(data))]
+        self.assertListEqual(
+            chunk_types, [b"IHDR", b"sRGB", b"cICP", b"eXIf", b"IDAT", b"IEND"]
+        )
+
+    def test_keeps_smaller_original(self):
+        data = make_png(64, 32, level=9)
+        self.assertIs(optimize_png(data), data)
+
+    def test_leaves_animated_and_invalid_files(self):
+        animated = make_png(64, 32, [(b"acTL", b"\x00" * 8)])
+        self.assertIs(optimize_png(animated), animated)
+        self.assertEqual(optimize_png(b"not a png"), b"not a png")
+        self.assertEqual(optimize_png(make_png(4, 4)[:-20]), make_png(4, 4)[:-20])
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_png(self):
+        self.assertEqual(image_size(self.write("a.png", make_png(12, 7))), (12, 7))
+
+    def test_gif(self):
+        data = b"GIF89a" + struct.pack("<HH", 30, 20) + b"\x00" * 10
+        self.assertEqual(image_size(self.write("a.gif", data)), (30, 20))
+
+    def test_jpeg(self):
+        app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+        sof = b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 240, 320) + b"\x00" * 10
+        data = b"\xff\xd8" + app0 + sof + b"\xff\xd9"
+        self.assertEqual(image_size(self.write("a.jpg", data)), (320, 240))
+
+    def test_unknown(self):
+        self.assertIsNone(image_size(self.write("a.txt", b"hello")))
+        self.assertIsNone(image_size(self.write("b.jpg", b"\xff\xd8\xff\xe0")))
+
+
+class TestImageOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.optimizer = ImageOptimizer(os.path.join(self.tmp.name, "cache"))
+        self.src = os.path.join(self.tmp.name, "a.png")
+        with open(self.src, "wb") as f:
+            f.write(make_png(64, 32))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pipeline_for(self):
+        self.assertIsNotNone(self.optimizer.pipeline_for("images/A.PNG"))
+        self.assertIsNone(self.optimizer.pipeline_for("index.css"))
+
+    def test_optimize_caches_result(self):
+        dest = os.path.join(self.tmp.name, "out.png")
+        self.optimizer.optimize(self.src, dest)
+        with open(dest, "rb") as f:
+            optimized = f.read()
+        self.assertEqual(os.stat(dest).st_mtime_ns, os.stat(self.src).st_mtime_ns)
+
+        cached = [files for _, _, files in os.walk(self.optimizer.cache_dir) if files]
+        self.assertEqual(len(cached), 1)
+
+        again = os.path.join(self.tmp.name, "again.png")
+        self.optimizer.optimize(self.src, again)
+        with open(again, "rb") as f:
+            self.assertEqual(f.read(), optimized)
+
+
+class TestAddImageAttributes(unittest.TestCase):
+    def test_adds_sizes_and_loading_hints(self):
+        node = markdown_to_html_node(
+            "![a](/images/a.png)\n\n- ![b](/images/b.png)\n\n![c](https://x.y/c.png)"
+        )
+        add_image_attributes(node, {"/images/a.png": [10, 20], "/images/b.png": [3, 4]})
+        self.assertEqual(
+            node.to_html(),
+            '<div><p><img src="/images/a.png" alt="a" width="10" height="20" '
+            'decoding="async"></img></p><ul><li><img src="/images/b.png" alt="b" '
+            'width="3" height="4" loading="lazy" decoding="async"></img></li></ul>'
+            '<p><img src="https://x.y/c.png" alt="c" loading="lazy" '
+            'decoding="async"></img></p></div>',
+        )
+
+
+    def test_eager_images_carry_over(self):
+        first = markdown_to_html_node("![a](/a.png)")
+        second = markdown_to_html_node("![b](/b.png)")
+        remaining = add_image_attributes(first, {}, eager_images=1)
+        self.assertEqual(remaining, 0)
+        add_image_attributes(second, {}, remaining)
+        self.assertIn('loading="lazy"', second.to_html())
+        self.assertNotIn('loading="lazy"', first.to_html())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,6 @@
+import glob
+import os
+import random
 import unittest
 
 from inline_markdown import (
@@ -6,9 +9,12 @@ from inline_markdown import (
     split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
+    text_links,
+    text_to_html,
     text_to_text_nodes,
+    text_to_text_nodes_multipass,
 )
-from textnode import TextNode, TextType
+from textnode import TextNode, TextType, text_node_to_html_node
 
 
 class TestInlineMarkdown(unittest.TestCase):
@@ -237,6 +243,33 @@ class TestInlineMarkdown(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_links_repeated(self):
+        node = TextNode("[a](/x) and [a](/x)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("a", TextType.LINK, "/x"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "/x"),
+            ],
+            split_nodes_link([node]),
+        )
+
+    def test_split_links_after_matching_image(self):
+        node = TextNode("![a](/x) [a](/x)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("![a](/x) ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "/x"),
+            ],
+            split_nodes_link([node]),
+        )
+
+    def test_split_links_many(self):
+        text = "".join(f"see [link {i}](/p/{i}) " for i in range(500))
+        new_nodes = split_nodes_link([TextNode(text, TextType.TEXT)])
+        self.assertEqual(len(new_nodes), 1001)
+        self.assertEqual(new_nodes[-2], TextNode("link 499", TextType.LINK, "/p/499"))
+
     # text to text nodes
 
     def test_mixed_formats(self):
@@ -285,5 +318,73 @@ class TestInlineMarkdown(unittest.TestCase):
         self.assertListEqual(result, expected_result)
 
 
+class TestSinglePassTokenizer(unittest.TestCase):
+    def assertMatchesMultipass(self, text):
+        try:
+            expected = text_to_text_nodes_multipass(text)
+        except ValueError:
+            with self.assertRaises(ValueError, msg=repr(text)):
+                text_to_text_nodes(text)
+            with self.assertRaises(ValueError, msg=repr(text)):
+                text_to_html(text)
+            return
+        self.assertListEqual(text_to_text_nodes(text), expected, msg=repr(text))
+
+        # The fused renderer must match the nodes it skips building.
+        for basepath in ("/", "/ssg/"):
+            html = "".join(
+                text_node_to_html_node(node).to_html(basepath) for node in expected
+            )
+            self.assertEqual(text_to_html(text, basepath), html, msg=repr(text))
+
+        # So must the link scan the checker uses.
+        links = [
+            (node.text_type == TextType.IMAGE, node.url)
+            for node in expected
+            if node.text_type in (TextType.LINK, TextType.IMAGE)
+        ]
+        found = [(is_image, url) for _, is_image, url in text_links(text)]
+        self.assertListEqual(found, links, msg=repr(text))
+
+    def test_equivalent_on_samples(self):
+        samples = [
+            "",
+            "plain",
+            "a``b",
+            "**bold** and _italic_ and `code`",
+            "_italic with **stars** inside_",
+            "`code with _under_ and **bold**`",
+            "***",
+            "a***b**",
+            "text [link](https://boot.dev) and ![img](/a.png) end",
+            "[first](/1)[second](/2)![third](/3)",
+            "**[bold link](/x)** [plain](/y)",
+            "[empty]() and ![](/no-alt.png)",
+            "unclosed `code",
+            "unclosed _italic",
+            "unclosed **bold",
+            "**bold _crossing** italic_",
+            "_italic `crossing_ code`",
+        ]
+        for text in samples:
+            self.assertMatchesMultipass(text)
+
+    def test_equivalent_on_random_text(self):
+        pieces = ["a", " ", "`", "_", "**", "*", "[x](u)", "![y](v)"]
+        pieces += ["[", "]", "(", ")"]
+        rng = random.Random(1234)
+        for _ in range(2000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            self.assertMatchesMultipass(text)
+
+    def test_equivalent_on_content(self):
+        content_dir = os.path.join(os.path.dirname(__file__), "..", "content")
+        pattern = os.path.join(content_dir, "**", "*.md")
+        for path in glob.glob(pattern, recursive=True):
+            with open(path) as f:
+                for block in f.read().split("\n\n"):
+                    self.assertMatchesMultipass(" ".join(block.split("\n")))
+
+
 if __name__ == "__main__":
     unittest.main()
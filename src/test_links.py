@@ -0,0 +1,115 @@
+import os
+import unittest
+
+from links import (
+    BrokenLink,
+    build_link_index,
+    check_links,
+    format_broken_link,
+    iter_page_links,
+)
+from manifest import empty_manifest
+from site_fixture import SiteTestCase
+
+
+class TestPageLinks(unittest.TestCase):
+    def test_links_carry_their_source_line(self):
+        markdown = "\n".join(
+            [
+                "# Title [home](/)",
+                "",
+                "A paragraph",
+                "with [a link](/a) and",
+                "![an image](/b.png)",
+                "",
+                "",
+                "> quoted",
+                "> [quote link](/c)",
+                "",
+                "- [first](/d)",
+                "- [second](/e)",
+                "",
+                "1. [one](/f)",
+            ]
+        )
+        self.assertListEqual(
+            list(iter_page_links(markdown.split("\n"))),
+            [
+                (1, False, "/"),
+                (4, False, "/a"),
+                (5, True, "/b.png"),
+                (9, False, "/c"),
+                (11, False, "/d"),
+                (12, False, "/e"),
+                (14, False, "/f"),
+            ],
+        )
+
+    def test_code_is_not_checked(self):
+        markdown = "```\n[code](/x)\n\n[still code](/y)\n```\n\n`[span](/z)` [real](/r)"
+        self.assertListEqual(
+            list(iter_page_links(markdown.split("\n"))), [(7, False, "/r")]
+        )
+
+
+class TestCheckLinks(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = os.path.join(self.content, "index.md")
+        self.post = os.path.join(self.content, "post.md")
+        self.write(self.post, "# Post\n\n[home](/)")
+        self.write(self.template, '<link href="/index.css" />\n<img src="/gone.png">')
+        self.manifest = empty_manifest()
+        self.manifest["assets"] = {"index.css": {}, "images/a b.png": {}}
+        self.manifest["pages"] = {
+            self.page: {"output": "index.html"},
+            self.post: {"output": os.path.join("blog", "post", "index.html")},
+        }
+
+    def test_index_honors_basepath(self):
+        index = build_link_index(self.manifest, "/ssg/")
+        for url in ("/ssg/", "/ssg/index.css", "/ssg/blog/post", "/ssg/blog/post/"):
+            self.assertIn(url, index)
+        self.assertNotIn("/blog/post", index)
+
+    def test_reports_broken_links_only(self):
+        self.write(
+            self.page,
+            "# Home\n\n[post](/blog/post#top) [ext](https://x.dev) [ext](//cdn.dev)\n"
+            "![ok](/images/a%20b.png) [missing](/blog/gone?q=1)\n\n"
+            "- ![missing](/images/gone.png)",
+        )
+        self.assertListEqual(
+            check_links(self.manifest, "/ssg/"),
+            [
+                BrokenLink(self.page, 4, "/blog/gone?q=1"),
+                BrokenLink(self.page, 6, "/images/gone.png", True),
+            ],
+        )
+
+    def test_checks_template_and_fingerprinted_assets(self):
+        self.write(self.page, "# Home\n\n![logo](/images/a b.png)")
+        self.manifest["fingerprints"] = {
+            "images/a b.png": {"path": "images/a b.0123456789.png"}
+        }
+        assets = {"/images/a b.png": "/images/a b.0123456789.png"}
+        broken = check_links(self.manifest, "/", assets, self.template)
+        self.assertListEqual(broken, [BrokenLink(self.template, 2, "/gone.png")])
+        self.assertEqual(
+            format_broken_link(broken[0]), f"{self.template}:2: broken link /gone.png"
+        )
+
+    def test_template_skips_external_urls(self):
+        self.write(self.page, "# Home")
+        self.write(
+            self.template,
+            '<script src="//cdn.example.com/x.js"></script>\n<a href="/gone">',
+        )
+        self.assertListEqual(
+            check_links(self.manifest, "/", template_path=self.template),
+            [BrokenLink(self.template, 2, "/gone")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from minify import CssMinifier, minify_css, minify_html
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_strips_space_around_block_tags(self):
+        html = '<html>\n  <head>\n    <meta charset="utf-8" />\n  </head>\n</html>\n'
+        self.assertEqual(
+            minify_html(html), '<html><head><meta charset="utf-8" /></head></html>'
+        )
+
+    def test_keeps_single_space_between_inline_tags(self):
+        self.assertEqual(
+            minify_html("<p>a  <b>b</b>\n   <i>c</i></p>"),
+            "<p>a <b>b</b> <i>c</i></p>",
+        )
+
+    def test_preserves_pre_and_script(self):
+        html = "<div>\n<pre>  x\n    y</pre>\n<script>\n  let a  = 1;\n</script></div>"
+        self.assertEqual(
+            minify_html(html),
+            "<div><pre>  x\n    y</pre><script>\n  let a  = 1;\n</script></div>",
+        )
+
+    def test_keeps_space_around_textarea(self):
+        self.assertEqual(
+            minify_html("<p>a\n<textarea> x </textarea>\nb</p>"),
+            "<p>a <textarea> x </textarea> b</p>",
+        )
+
+    def test_removes_comments(self):
+        self.assertEqual(minify_html("<div> <!-- note -->\n</div>"), "<div></div>")
+
+    def test_keeps_no_break_space(self):
+        self.assertEqual(minify_html("<p> \xa0 </p>"), "<p>\xa0</p>")
+
+    def test_keeps_placeholders(self):
+        self.assertEqual(
+            minify_html("<title>{{ Title }}</title>\n<article>{{ Content }}</article>"),
+            "<title>{{ Title }}</title><article>{{ Content }}</article>",
+        )
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_strips_whitespace_and_comments(self):
+        css = "/* theme */\nh1,\nh2 {\n    color: #fff;\n    margin: 0 auto;\n}\n"
+        self.assertEqual(minify_css(css), "h1,h2{color:#fff;margin:0 auto}")
+
+    def test_keeps_strings(self):
+        css = 'a::before { content: "a ; } /* x */"; font-family: "Courier New"; }'
+        self.assertEqual(
+            minify_css(css),
+            'a::before{content:"a ; } /* x */";font-family:"Courier New"}',
+        )
+
+    def test_keeps_descendant_pseudo_class(self):
+        self.assertEqual(minify_css("a :hover { color: red; }"), "a :hover{color:red}")
+
+    def test_media_query(self):
+        css = "@media (max-width: 600px) {\n  body > p { padding: 0; }\n}"
+        self.assertEqual(minify_css(css), "@media (max-width:600px){body>p{padding:0}}")
+
+    def test_css_minifier(self):
+        minifier = CssMinifier()
+        self.assertIsNone(minifier.pipeline_for("a.png"))
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "a.css")
+            dest = os.path.join(tmp, "b.css")
+            with open(src, "w") as f:
+                f.write("b {\n    font-weight: 900;\n}\n")
+            minifier.optimize(src, dest)
+            with open(dest) as f:
+                self.assertEqual(f.read(), "b{font-weight:900}")
+            self.assertEqual(os.stat(dest).st_mtime_ns, os.stat(src).st_mtime_ns)
+
+
+if __name__ == "__main__":
+    unittest.main()
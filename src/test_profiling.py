@@ -0,0 +1,108 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import block_markdown
+import generation
+from fragment_cache import FragmentCache
+from generation import generate_page
+from profiling import STAGES, BuildProfiler
+from template import Template
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "index.md")
+        with open(self.source, "w") as f:
+            f.write("# Home\n\nA [link](/about) and **bold**\n\n- one\n- two")
+        self.template = Template.compile(
+            '<link href="/index.css" /><title>{{ Title }}</title>{{ Content }}',
+            "/ssg/",
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_profiled_output_matches_generate_page(self):
+        profiled = os.path.join(self.tmp.name, "profiled.html")
+        expected = os.path.join(self.tmp.name, "expected.html")
+        BuildProfiler().profile_page(self.source, self.template, profiled, "/ssg/")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page(
+                self.source, "template.html", expected, "/ssg/", template=self.template
+            )
+        self.assertEqual(self.read(profiled), self.read(expected))
+
+    def test_report(self):
+        profiler = BuildProfiler()
+        dest = os.path.join(self.tmp.name, "index.html")
+        profiler.profile_page(self.source, self.template, dest)
+        report_path = os.path.join(self.tmp.name, "profile.json")
+        profiler.write_report(report_path)
+
+        report = json.loads(self.read(report_path))
+        self.assertEqual(report["page_count"], 1)
+        self.assertListEqual(list(report["stages"]), list(STAGES))
+        page = report["pages"][0]
+        self.assertEqual(page["source"], self.source)
+        self.assertEqual(page["path"], "render")
+        self.assertListEqual(
+            list(page["stages"]),
+            ["read", "parse_blocks", "inline_parse", "render", "write"],
+        )
+        self.assertGreater(page["stages"]["inline_parse"]["seconds"], 0)
+        self.assertListEqual(profiler.slowest_pages(5), [page])
+
+    def test_pages_take_the_generate_page_branches(self):
+        profiler = BuildProfiler()
+        dest = os.path.join(self.tmp.name, "index.html")
+        cache = FragmentCache(os.path.join(self.tmp.name, "cache"))
+        profiler.profile_page(self.source, self.template, dest, images={})
+        profiler.profile_page(self.source, self.template, dest, cache=cache)
+        profiler.profile_page(self.source, self.template, dest, cache=cache)
+        with mock.patch.object(generation, "STREAM_THRESHOLD_BYTES", 0):
+            title, terms = profiler.profile_page(
+                self.source, self.template, dest, search=True
+            )
+
+        self.assertEqual(title, "Home")
+        self.assertEqual(terms["bold"], 1)
+        paths = [page["path"] for page in profiler.pages]
+        self.assertListEqual(paths, ["nodes", "cache_miss", "cache_hit", "stream"])
+        nodes, miss, hit, stream = (page["stages"] for page in profiler.pages)
+        self.assertIn("node_construction", nodes)
+        self.assertIn("render", miss)
+        self.assertIn("inline_parse", miss)
+        self.assertListEqual(list(hit), ["read", "cache", "write"])
+        self.assertListEqual(list(stream), ["parse_blocks", "inline_parse", "stream"])
+        self.assertEqual(profiler.report()["paths"]["cache_hit"], 1)
+
+    def test_instrumentation_is_removed(self):
+        originals = (
+            block_markdown.text_to_text_nodes,
+            block_markdown.iter_blocks,
+            generation.iter_blocks,
+        )
+        dest = os.path.join(self.tmp.name, "index.html")
+        BuildProfiler().profile_page(self.source, self.template, dest)
+        self.assertEqual(
+            (
+                block_markdown.text_to_text_nodes,
+                block_markdown.iter_blocks,
+                generation.iter_blocks,
+            ),
+            originals,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
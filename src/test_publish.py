@@ -0,0 +1,103 @@
+import os
+import unittest
+from unittest import mock
+
+import publish
+from manifest import MANIFEST_FILENAME
+from publish import (
+    output_changes,
+    publish_output,
+    snapshot_output,
+    stage_output,
+    staging_path,
+)
+from site_fixture import SiteTestCase
+
+
+class TestStagedPublish(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nMe")
+        self.build()
+
+    def test_stage_links_previous_output(self):
+        staging_dir = stage_output(self.output)
+        self.assertEqual(staging_dir, staging_path(self.output))
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.output, "index.html"),
+                os.path.join(staging_dir, "index.html"),
+            )
+        )
+
+    def test_staged_build_reuses_unchanged_pages(self):
+        staging_dir = stage_output(self.output)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        generated = self.build(staging_dir)
+        self.assertEqual(generated, [os.path.join(staging_dir, "index.html")])
+
+    def test_staged_build_leaves_published_output_alone(self):
+        published = os.path.join(self.output, "index.html")
+        before = self.read(published)
+        staging_dir = stage_output(self.output)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        self.build(staging_dir)
+
+        self.assertEqual(self.read(published), before)
+        publish_output(staging_dir, self.output)
+        self.assertIn("Edited", self.read(published))
+        self.assertFalse(os.path.exists(staging_dir))
+
+    def test_clean_stage_starts_empty(self):
+        staging_dir = stage_output(self.output, reuse=False)
+        self.assertListEqual(os.listdir(staging_dir), [])
+        self.assertEqual(len(self.build(staging_dir)), 2)
+
+    def test_leftover_staging_is_discarded(self):
+        staging_dir = staging_path(self.output)
+        os.makedirs(staging_dir)
+        self.write(os.path.join(staging_dir, "partial.html"), "<p>half")
+        stage_output(self.output)
+        self.assertFalse(os.path.exists(os.path.join(staging_dir, "partial.html")))
+
+    def test_publish_without_previous_output(self):
+        output_dir = os.path.join(self.root, "site")
+        staging_dir = stage_output(output_dir)
+        self.build(staging_dir)
+        publish_output(staging_dir, output_dir)
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "index.html")))
+        self.assertFalse(os.path.exists(staging_dir))
+
+    def test_publish_falls_back_to_two_renames(self):
+        staging_dir = stage_output(self.output)
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nYou")
+        self.build(staging_dir)
+        with mock.patch.object(publish, "exchange_paths", return_value=False):
+            publish_output(staging_dir, self.output)
+        self.assertIn("You", self.read(os.path.join(self.output, "about.html")))
+        self.assertListEqual(
+            sorted(os.listdir(self.root)),
+            ["content", "docs", "static", "template.html"],
+        )
+
+    def test_output_changes_lists_only_rewritten_files(self):
+        before = snapshot_output(self.output)
+        self.assertNotIn(MANIFEST_FILENAME, before)
+        staging_dir = stage_output(self.output)
+        # Re-rendered but byte-identical pages don't count as changed.
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello\n")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nYou")
+        self.build(staging_dir)
+        os.remove(os.path.join(staging_dir, "index.html"))
+        self.write(os.path.join(staging_dir, "new.txt"), "new")
+
+        changed, removed = output_changes(before, snapshot_output(staging_dir))
+        self.assertListEqual(changed, ["about.html", "new.txt"])
+        self.assertListEqual(removed, ["index.html"])
+
+    def test_snapshot_of_missing_output(self):
+        self.assertEqual(snapshot_output(os.path.join(self.root, "nope")), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
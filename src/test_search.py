@@ -0,0 +1,241 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+import generation
+import search
+from block_markdown import parse_markdown, render_document
+from fragment_cache import FragmentCache
+from manifest import load_manifest
+from search import SEARCH_DIR, page_terms, page_url
+from site_fixture import SiteTestCase
+
+
+class TestPageTerms(unittest.TestCase):
+    def test_counts_visible_words(self):
+        markdown = (
+            "# The Title\n\n"
+            "Some _italic_ and [link text](/hidden/url) and ![alt words](/x.png)\n\n"
+            "- listed item\n"
+            "1. numbered item\n\n"
+            "> quoted text\n\n"
+            "```\ncode_block words\n```"
+        )
+        rendered = []
+        render_document(markdown, texts=rendered)
+        parsed = []
+        parse_markdown(markdown, parsed)
+        self.assertListEqual(parsed, rendered)
+        self.assertEqual(
+            dict(page_terms(rendered)),
+            {
+                "the": 1,
+                "title": 1,
+                "some": 1,
+                "italic": 1,
+                "and": 2,
+                "link": 1,
+                "text": 2,
+                "alt": 1,
+                "words": 2,
+                "listed": 1,
+                "item": 2,
+                "numbered": 1,
+                "quoted": 1,
+                "code": 1,
+                "block": 1,
+            },
+        )
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html"), "/")
+        blog = os.path.join("blog", "index.html")
+        self.assertEqual(page_url(blog, "/ssg/"), "/ssg/blog/")
+        self.assertEqual(page_url("about.html", "/ssg/"), "/ssg/about.html")
+
+
+class TestSearchIndex(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome hobbits")
+        self.write(
+            os.path.join(self.content, "blog", "index.md"),
+            "# Blog\n\nHobbits and wizards and [elves](/elves)",
+        )
+
+    def build(self, output=None, search=True, jobs=1, cache=None):
+        return super().build(output, "/ssg/", jobs=jobs, search=search, cache=cache)
+
+    def read_json(self, *parts):
+        with open(os.path.join(self.output, SEARCH_DIR, *parts)) as f:
+            return json.load(f)
+
+    def lookup(self, term, output=None):
+        # What a browser does: fetch the parts of a term split by doc id, or
+        # else the shard of the longest listed prefix, then the doc shards
+        # of the hits.
+        directory = os.path.join(output or self.output, SEARCH_DIR)
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if term in meta["parts"]:
+            shards = [f"{term}.{n}" for n in range(len(meta["parts"][term]))]
+        else:
+            prefix = max(
+                (prefix for prefix in meta["prefixes"] if term.startswith(prefix)),
+                key=len,
+                default=None,
+            )
+            shards = [] if prefix is None else [prefix]
+        flat = []
+        for shard in shards:
+            with open(os.path.join(directory, "t", f"{shard}.json")) as f:
+                flat.extend(json.load(f).get(term, []))
+        hits = {}
+        for doc_id, count in zip(flat[0::2], flat[1::2]):
+            shard = doc_id // meta["docs_per_shard"]
+            with open(os.path.join(directory, "d", f"{shard}.json")) as f:
+                hits[json.load(f)[str(doc_id)][0]] = count
+        return hits
+
+    def snapshot(self, output=None):
+        directory = os.path.join(output or self.output, SEARCH_DIR)
+        files = {}
+        for dir_path, _, file_names in os.walk(directory):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                with open(path) as f:
+                    files[os.path.relpath(path, directory)] = f.read()
+        return files
+
+    def test_lookup_finds_pages(self):
+        self.build()
+        self.assertEqual(self.lookup("hobbits"), {"/ssg/": 1, "/ssg/blog/": 1})
+        self.assertEqual(self.lookup("wizards"), {"/ssg/blog/": 1})
+        self.assertEqual(self.lookup("ssg"), {})
+        self.assertEqual(
+            self.read_json("d", "0.json"),
+            {"0": ["/ssg/blog/", "Blog"], "1": ["/ssg/", "Home"]},
+        )
+
+    def test_edit_rewrites_only_touched_shards(self):
+        self.build()
+        before = self.snapshot()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome dwarves")
+        self.assertEqual(len(self.build()), 1)
+        after = self.snapshot()
+
+        changed = {path for path in after if before.get(path) != after[path]}
+        # meta.json lists the new "dw" prefix.
+        self.assertEqual(
+            changed,
+            {"meta.json", os.path.join("t", "dw.json"), os.path.join("t", "ho.json")},
+        )
+        self.assertEqual(self.lookup("hobbits"), {"/ssg/blog/": 1})
+        self.assertEqual(self.lookup("dwarves"), {"/ssg/": 1})
+
+    def test_removed_page_leaves_index(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.build()
+        self.assertEqual(self.lookup("hobbits"), {"/ssg/": 1})
+        self.assertFalse(
+            os.path.exists(os.path.join(self.output, SEARCH_DIR, "t", "wi.json"))
+        )
+
+    def test_enabling_indexes_current_pages_and_disabling_removes(self):
+        self.build(search=False)
+        self.assertEqual(len(self.build()), 2)
+        self.assertEqual(self.lookup("welcome"), {"/ssg/": 1})
+        self.assertListEqual(self.build(search=False), [])
+        self.assertFalse(os.path.exists(os.path.join(self.output, SEARCH_DIR)))
+        self.assertEqual(load_manifest(self.output)["search"], {})
+
+    def test_large_shards_split_and_spill(self):
+        words = " ".join(f"hob{i:03d}" for i in range(200))
+        self.write(os.path.join(self.content, "index.md"), f"# Home\n\n{words}")
+        with (
+            mock.patch.object(search, "MAX_SHARD_BYTES", 300),
+            mock.patch.object(search, "SPILL_BUFFER_BYTES", 100),
+        ):
+            self.build()
+            prefixes = self.read_json("meta.json")["prefixes"]
+            self.assertIn("hob12", prefixes)
+            self.assertNotIn("ho", prefixes)
+            self.assertEqual(self.lookup("hob123"), {"/ssg/": 1})
+            self.assertEqual(self.lookup("hobbits"), {"/ssg/blog/": 1})
+
+            # Updating pages after a split matches indexing them from scratch.
+            self.write(os.path.join(self.content, "index.md"), "# Home\n\nhob123")
+            self.write(
+                os.path.join(self.content, "blog", "index.md"), f"# Blog\n\n{words}"
+            )
+            self.build()
+            fresh = os.path.join(self.root, "fresh")
+            self.build(fresh)
+        self.assertEqual(self.snapshot(), self.snapshot(fresh))
+        self.assertEqual(self.lookup("hob123"), {"/ssg/": 1, "/ssg/blog/": 1})
+
+    def test_common_term_splits_by_doc_id(self):
+        for i in range(40):
+            self.write(os.path.join(self.content, f"p{i}.md"), f"# P{i}\n\nthe end")
+        with (
+            mock.patch.object(search, "MAX_SHARD_BYTES", 100),
+            mock.patch.object(search, "SPILL_BUFFER_BYTES", 200),
+        ):
+            self.build()
+            starts = self.read_json("meta.json")["parts"]["the"]
+            self.assertEqual(starts, sorted(starts))
+            for n in range(len(starts)):
+                part = os.path.join(self.output, SEARCH_DIR, "t", f"the.{n}.json")
+                self.assertLessEqual(os.path.getsize(part), 100)
+            self.assertEqual(len(self.lookup("the")), 40)
+
+            for i in range(20):
+                os.remove(os.path.join(self.content, f"p{i}.md"))
+            self.build()
+            fresh = os.path.join(self.root, "fresh")
+            self.build(fresh)
+            self.assertEqual(self.lookup("the"), self.lookup("the", fresh))
+            self.assertEqual(self.lookup("end"), self.lookup("end", fresh))
+
+        meta = self.read_json("meta.json")
+        self.assertLess(len(meta["parts"]["the"]), len(starts))
+        # Parts past the new count are gone.
+        self.assertEqual(
+            {name for name in self.snapshot() if name.count(".") == 2},
+            {
+                os.path.join("t", f"{term}.{n}.json")
+                for term, term_starts in meta["parts"].items()
+                for n in range(len(term_starts))
+            },
+        )
+        self.assertEqual(
+            self.lookup("the"), {f"/ssg/p{i}.html": 1 for i in range(20, 40)}
+        )
+
+    def test_cached_terms_match_uncached(self):
+        self.build()
+        cache = FragmentCache(os.path.join(self.root, "cache"))
+        cached = os.path.join(self.root, "cached")
+        self.build(cached, cache=cache)
+        self.assertEqual(self.snapshot(cached), self.snapshot())
+
+        # Hits take their terms from the cache entry instead of the blocks.
+        again = os.path.join(self.root, "again")
+        with mock.patch("fragment_cache.render_fragment") as render:
+            self.build(again, cache=cache)
+        render.assert_not_called()
+        self.assertEqual(self.snapshot(again), self.snapshot())
+
+    def test_parallel_and_streamed_pages_match_serial(self):
+        self.build()
+        for jobs, threshold in ((3, generation.STREAM_THRESHOLD_BYTES), (1, 0)):
+            output = os.path.join(self.root, f"out-{jobs}-{threshold}")
+            with mock.patch.object(generation, "STREAM_THRESHOLD_BYTES", threshold):
+                self.build(output, jobs=jobs)
+            self.assertEqual(self.snapshot(output), self.snapshot())
+
+
+if __name__ == "__main__":
+    unittest.main()
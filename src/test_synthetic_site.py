@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from block_markdown import extract_title, markdown_to_html_node
+from generation import collect_pages
+from synthetic_site import SiteConfig, generate_site
+
+
+class TestSyntheticSite(unittest.TestCase):
+    def test_generated_pages_parse(self):
+        config = SiteConfig(pages=30, depth=3, static_files=2, static_file_size=16)
+        with tempfile.TemporaryDirectory() as root:
+            content_dir, static_dir, template_path = generate_site(root, config)
+            pages = collect_pages(content_dir, os.path.join(root, "docs"))
+            self.assertEqual(len(pages), 30)
+            self.assertTrue(os.path.exists(template_path))
+            self.assertEqual(len(os.listdir(os.path.join(static_dir, "images"))), 2)
+            for src_path, _ in pages:
+                with open(src_path) as f:
+                    markdown = f.read()
+                self.assertTrue(extract_title(markdown).startswith("Page "))
+                markdown_to_html_node(markdown).to_html()
+
+    def test_seed_is_deterministic(self):
+        config = SiteConfig(pages=5, static_files=0)
+        outputs = []
+        for _ in range(2):
+            with tempfile.TemporaryDirectory() as root:
+                content_dir, _, _ = generate_site(root, config)
+                pages = collect_pages(content_dir, os.path.join(root, "docs"))
+                texts = []
+                for src_path, _ in pages:
+                    with open(src_path) as f:
+                        texts.append(f.read())
+                outputs.append(texts)
+        self.assertListEqual(outputs[0], outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
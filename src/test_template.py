@@ -0,0 +1,107 @@
+import io
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, rewrite_basepath
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_fragments_and_slots(self):
+        template = Template.compile("<title>{{ Title }}</title><p>{{ Content }}</p>")
+        self.assertListEqual(template.fragments, ["<title>", "</title><p>", "</p>"])
+        self.assertListEqual(template.slots, ["Title", "Content"])
+
+    def test_compile_without_placeholders(self):
+        template = Template.compile("<p>static</p>")
+        self.assertListEqual(template.fragments, ["<p>static</p>"])
+        self.assertListEqual(template.slots, [])
+        self.assertEqual(template.render(), "<p>static</p>")
+
+    def test_render(self):
+        template = Template.compile("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(
+            template.render(Title="Home", Content="<p>Hi</p>"),
+            "<title>Home</title><p>Hi</p>",
+        )
+
+    def test_render_repeated_slot(self):
+        template = Template.compile("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render(Title="x"), "x|x")
+
+    def test_write_streams_nodes(self):
+        template = Template.compile("<title>{{ Title }}</title>{{ Content }}")
+        buffer = io.StringIO()
+        template.write(
+            buffer, Title="Home", Content=ParentNode("p", [LeafNode(None, "Hi")])
+        )
+        self.assertEqual(buffer.getvalue(), "<title>Home</title><p>Hi</p>")
+
+    def test_write_callable_value(self):
+        template = Template.compile("[{{ Content }}]")
+        chunks = []
+        template.write(chunks, Content=lambda write: write("x"))
+        self.assertListEqual(chunks, ["[", "x", "]"])
+
+    def test_write_resolves_node_urls(self):
+        template = Template.compile('<a href="/">home</a>{{ Content }}', "/ssg/")
+        chunks = []
+        template.write(chunks, Content=LeafNode("a", "x", {"href": "/blog"}))
+        self.assertEqual(
+            "".join(chunks), '<a href="/ssg/">home</a><a href="/ssg/blog">x</a>'
+        )
+
+    def test_render_missing_value(self):
+        template = Template.compile("{{ Title }}")
+        with self.assertRaises(KeyError):
+            template.render()
+
+    def test_compile_rewrites_basepath(self):
+        template = Template.compile(
+            '<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/ssg/"
+        )
+        self.assertEqual(
+            template.fragments[0],
+            '<link href="/ssg/index.css" /><img src="/ssg/a.png" />',
+        )
+
+    def test_compile_does_not_rewrite_values(self):
+        template = Template.compile("{{ Content }}", "/ssg/")
+        self.assertEqual(
+            template.render(Content='<a href="/x">x</a>'), '<a href="/x">x</a>'
+        )
+
+    def test_rewrite_basepath_skips_other_urls(self):
+        html = '<a href="//cdn.example.com/x">x</a><a href="https://a.b/">y</a>'
+        self.assertEqual(rewrite_basepath(html, "/ssg/"), html)
+
+    def test_compile_maps_assets(self):
+        assets = {"/index.css": "/index.0123456789.css"}
+        template = Template.compile(
+            '<link href="/index.css" /><a href="/">home</a>', "/", assets
+        )
+        self.assertEqual(
+            template.render(),
+            '<link href="/index.0123456789.css" /><a href="/">home</a>',
+        )
+
+    def test_write_maps_node_assets(self):
+        assets = {"/a.png": "/a.0123456789.png"}
+        template = Template.compile("{{ Content }}", "/ssg/", assets)
+        chunks = []
+        template.write(chunks, Content=LeafNode("img", "", {"src": "/a.png"}))
+        self.assertEqual("".join(chunks), '<img src="/ssg/a.0123456789.png"></img>')
+
+    def test_compile_minifies(self):
+        source = "<html>\n  <body>\n    <article>{{ Content }}</article>\n  </body>"
+        template = Template.compile(source, minify=True)
+        self.assertListEqual(
+            template.fragments, ["<html><body><article>", "</article></body>"]
+        )
+
+    def test_rewrite_basepath_root(self):
+        html = '<a href="/x">x</a>'
+        self.assertIs(rewrite_basepath(html, "/"), html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+import urllib.request
+
+from search import SEARCH_DIR
+from site_fixture import SiteTestCase
+from watch import SiteWatcher, changed_paths, serve_directory
+
+
+class TestSiteWatcher(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nMe")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.watcher = SiteWatcher(
+            self.content, self.static, self.template, self.output
+        )
+        self.apply(list(self.watcher.snapshot()))
+
+    def apply(self, paths):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.watcher.apply(paths)
+
+    def test_changed_paths(self):
+        before = {"a": 1, "b": 1, "c": 1}
+        after = {"a": 1, "b": 2, "d": 1}
+        self.assertListEqual(changed_paths(before, after), ["b", "c", "d"])
+
+    def test_edit_rebuilds_only_that_page(self):
+        index = os.path.join(self.content, "index.md")
+        self.write(index, "# Home\n\nEdited")
+        self.assertListEqual(self.apply([index]), [index])
+        self.assertIn("Edited", self.read(os.path.join(self.output, "index.html")))
+
+    def test_unchanged_content_is_skipped(self):
+        index = os.path.join(self.content, "index.md")
+        self.assertListEqual(self.apply([index]), [])
+
+    def test_deleted_page_is_removed(self):
+        about = os.path.join(self.content, "about.md")
+        os.remove(about)
+        self.assertListEqual(self.apply([about]), [about])
+        self.assertFalse(os.path.exists(os.path.join(self.output, "about.html")))
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(len(self.apply([self.template])), 2)
+        self.assertTrue(
+            self.read(os.path.join(self.output, "about.html")).startswith("<h1>")
+        )
+
+    def test_static_change_is_synced(self):
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body { margin: 0 }")
+        self.assertListEqual(
+            self.apply([css]), [os.path.join(self.output, "index.css")]
+        )
+
+    def test_asset_change_rebuilds_only_linking_pages(self):
+        about = os.path.join(self.content, "about.md")
+        self.write(about, "# About\n\n[css](/index.css)")
+        other = os.path.join(self.static, "other.css")
+        self.write(other, "p {}")
+        self.watcher.fingerprint = True
+        self.apply(list(self.watcher.snapshot()))
+
+        self.write(other, "p { margin: 0 }")
+        self.assertNotIn(about, self.apply([other]))
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body { margin: 0 }")
+        rebuilt = self.apply([css])
+        self.assertIn(about, rebuilt)
+        self.assertNotIn(os.path.join(self.content, "index.md"), rebuilt)
+
+    def test_search_index_follows_edits(self):
+        self.watcher.search = True
+        self.watcher.manifest["pages"] = {}
+        self.apply(list(self.watcher.snapshot()))
+        about = os.path.join(self.content, "about.md")
+        self.write(about, "# About\n\nWizards")
+        self.apply([about])
+
+        shards = os.path.join(self.output, SEARCH_DIR, "t")
+        with open(os.path.join(shards, "wi.json")) as f:
+            self.assertIn("wizards", json.load(f))
+        self.assertFalse(os.path.exists(os.path.join(shards, "me.json")))
+
+    def test_serve_directory(self):
+        server = serve_directory(self.output, port=0, quiet=True)
+        try:
+            url = f"http://localhost:{server.server_port}/about.html"
+            with urllib.request.urlopen(url) as response:
+                self.assertIn(b"<title>About</title>", response.read())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+import functools
+import http.server
+import os
+import threading
+import time
+
+from compress import compress_outputs
+from copy_static import sync_directory, walk_files
+from fingerprint import asset_map, fingerprint_assets
+from generation import (
+    collect_pages,
+    generate_page,
+    page_hashes,
+    page_output_path,
+    remove_stale_output,
+)
+from images import image_sizes
+from manifest import (
+    hash_file,
+    is_page_current,
+    load_manifest,
+    page_entry,
+    save_manifest,
+)
+from search import SearchIndex
+from template import load_template, template_references
+
+
+class SiteWatcher:
+    def __init__(
+        self,
+        content_dir,
+        static_dir,
+        template_path,
+        output_dir,
+        basepath="/",
+        *,
+        cache=None,
+        fingerprint=False,
+        optimizers=(),
+        compress=False,
+        image_hints=False,
+        minify=False,
+        search=False,
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.output_dir = output_dir
+        self.basepath = basepath
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.optimizers = optimizers
+        self.compress = compress
+        self.image_hints = image_hints
+        self.minify = minify
+        self.search = search
+
+        # Kept warm between rebuilds so a single edit only costs one page.
+        self.manifest = load_manifest(output_dir)
+        self.assets = asset_map(self.manifest["fingerprints"]) if fingerprint else None
+        self.images = image_sizes(output_dir, self.manifest) if image_hints else None
+        self.load_template()
+
+    def load_template(self):
+        self.template = load_template(
+            self.template_path, self.basepath, self.assets, self.minify
+        )
+        self.template_hash = hash_file(self.template_path)
+        self.template_urls = template_references(self.template_path)
+
+    def snapshot(self):
+        mtimes = {}
+        for root in (self.content_dir, self.static_dir):
+            for rel_path in walk_files(root):
+                path = os.path.join(root, rel_path)
+                try:
+                    mtimes[path] = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+        if os.path.exists(self.template_path):
+            mtimes[self.template_path] = os.stat(self.template_path).st_mtime_ns
+        return mtimes
+
+    def apply(self, paths):
+        rebuilt = []
+        # Every page is checked against its manifest entry, and only the ones
+        # whose template, assets or image sizes changed are rendered again.
+        check_all = self.template_path in paths
+
+        # Static files go first so pages render against the new asset and image maps.
+        if any(is_under(path, self.static_dir) for path in paths):
+            copied, removed = sync_directory(
+                self.static_dir,
+                self.output_dir,
+                manifest=self.manifest,
+                optimizers=self.optimizers,
+            )
+            rebuilt.extend(copied + removed)
+            if self.image_hints:
+                images = image_sizes(self.output_dir, self.manifest)
+                if images != self.images:
+                    self.images = images
+                    check_all = True
+            if self.fingerprint:
+                assets = fingerprint_assets(self.output_dir, self.manifest)
+                if assets != self.assets:
+                    self.assets = assets
+                    check_all = True
+
+        if check_all:
+            self.load_template()
+            pages = collect_pages(self.content_dir, self.output_dir)
+            paths = list(paths) + [src_path for src_path, _ in pages]
+
+        search_index = None
+        if self.search:
+            search_index = SearchIndex(self.output_dir, self.manifest, self.basepath)
+        try:
+            for path in paths:
+                if is_under(path, self.content_dir) and path.endswith(".md"):
+                    if self.update_page(path, search_index):
+                        rebuilt.append(path)
+            if search_index is not None:
+                search_index.finish()
+        finally:
+            if search_index is not None:
+                search_index.close()
+
+        if self.compress and rebuilt:
+            compress_outputs(self.output_dir, manifest=self.manifest)
+        save_manifest(self.output_dir, self.manifest)
+        return rebuilt
+
+    def update_page(self, src_path, search_index=None):
+        pages = self.manifest["pages"]
+        rel_path = os.path.relpath(src_path, self.content_dir)
+        dest_path = page_output_path(os.path.join(self.output_dir, rel_path))
+
+        if not os.path.exists(src_path):
+            if pages.pop(src_path, None) is None:
+                return False
+            remove_stale_output(dest_path, self.output_dir)
+            if search_index is not None:
+                search_index.remove_page(src_path)
+            return True
+
+        page_assets_hash, page_images_hash = page_hashes(
+            src_path, self.assets, self.images, self.template_urls
+        )
+        entry = page_entry(
+            hash_file(src_path),
+            self.template_hash,
+            self.basepath,
+            os.path.relpath(dest_path, self.output_dir),
+            page_assets_hash,
+            page_images_hash,
+            self.minify,
+        )
+        if is_page_current(pages.get(src_path), entry, self.output_dir):
+            return False
+        title, terms = generate_page(
+            src_path,
+            self.template_path,
+            dest_path,
+            self.basepath,
+            template=self.template,
+            cache=self.cache,
+            images=self.images,
+            search=search_index is not None,
+        )
+        if search_index is not None:
+            search_index.add_page(src_path, dest_path, title, terms)
+        pages[src_path] = entry
+        return True
+
+
+def changed_paths(before, after):
+    paths = before.keys() | after.keys()
+    return sorted(path for path in paths if before.get(path) != after.get(path))
+
+
+def is_under(path, directory):
+    return os.path.abspath(path).startswith(os.path.abspath(directory) + os.sep)
+
+
+class QuietRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory, port=8888, quiet=False):
+    # Watch mode keeps the request log on stderr, quiet drops it.
+    handler_class = http.server.SimpleHTTPRequestHandler
+    if quiet:
+        handler_class = QuietRequestHandler
+    handler = functools.partial(handler_class, directory=directory)
+    server = http.server.ThreadingHTTPServer(("localhost", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def watch(watcher, port=8888, interval=0.5):
+    server = serve_directory(watcher.output_dir, port)
+    print(
+        f"Serving '{watcher.output_dir}' at http://localhost:{server.server_port}/ (Ctrl+C to stop)"
+    )
+
+    before = watcher.snapshot()
+    try:
+        while True:
+            time.sleep(interval)
+            after = watcher.snapshot()
+            paths = changed_paths(before, after)
+            before = after
+            if not paths:
+                continue
+
+            start = time.perf_counter()
+            try:
+                rebuilt = watcher.apply(paths)
+            except Exception as e:
+                print(f"Rebuild failed: {e}")
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {len(rebuilt)} file(s) in {elapsed_ms:.1f} ms")
+    except KeyboardInterrupt:
+        print("Stopping watch mode")
+    finally:
+        server.shutdown()
+        server.server_close()